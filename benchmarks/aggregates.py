@@ -0,0 +1,127 @@
+"""
+Time to summarize a synthetic roster: ``RosterAggregates`` against the same figures computed with plain Python
+loops over the characters, as ``/nlp_stats`` used to.
+
+    python -m benchmarks.aggregates [--characters 50000]
+"""
+import argparse
+import random
+import statistics
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from utils.aggregates import TIER_BOUNDS, RosterAggregates
+from utils.functions import STAT_NAMES
+from utils.normalize import normalize_race
+
+CLASSES = tuple(
+    "Artificer Barbarian Bard Cleric Druid Fighter Monk Paladin Ranger Rogue Sorcerer Warlock Wizard".split()
+)
+RACES = ("Wood Elf", "Hill Dwarf", "Human", "Variant Human", "Tiefling", "Dragonborn")
+
+
+def make_roster(characters: int, seed: int = 0) -> list[SimpleNamespace]:
+    """Characters with their users loaded, standing in for ``Character`` rows."""
+    rng = random.Random(seed)
+    roster = []
+    for i in range(1, characters + 1):
+        classes = {clas: rng.randint(1, 7) for clas in rng.sample(CLASSES, rng.choice((1, 1, 1, 2, 3)))}
+        roster.append(
+            SimpleNamespace(
+                id=i,
+                race=rng.choice(RACES),
+                level=sum(classes.values()),
+                classes=classes,
+                subclasses={clas: rng.choice("ABCDE") for clas in classes if rng.random() < 0.7},
+                stats={stat: rng.randint(8, 20) for stat in STAT_NAMES} if rng.random() > 0.01 else {},
+                user=SimpleNamespace(onServer=True, lastActive=datetime.now() - timedelta(days=rng.randint(0, 60))),
+            )
+        )
+    return roster
+
+
+def summarize_loops(roster) -> dict:
+    total = len(roster)
+    levels = [character.level for character in roster]
+    tiers = {tier: [] for tier in range(1, len(TIER_BOUNDS) + 2)}
+    for level in levels:
+        tiers[sum(level >= bound for bound in TIER_BOUNDS) + 1].append(level)
+    class_levels = {}
+    subclasses = {}
+    for character in roster:
+        for clas, level in character.classes.items():
+            class_levels[clas] = class_levels.get(clas, []) + [level]
+        for clas, sub in character.subclasses.items():
+            subclasses.setdefault(clas, Counter())[sub] += 1
+    stat_min = {}
+    for stat in STAT_NAMES:
+        values = [character.stats[stat] for character in roster if stat in character.stats]
+        stat_min[stat] = (min(values), values.count(min(values)))
+    return {
+        "total": total,
+        "races": dict(Counter(normalize_race(character.race) for character in roster)),
+        "level_mean": round(sum(levels) / total, 2),
+        "level_median": statistics.median(levels),
+        "tiers": {tier: (len(x), round(sum(x) / len(x), 2) if x else 0) for tier, x in tiers.items()},
+        "stat_means": {
+            stat: round(sum(character.stats.get(stat, 0) for character in roster) / total, 2) for stat in STAT_NAMES
+        },
+        "stat_min": stat_min,
+        "classes": {clas: len(x) for clas, x in class_levels.items()},
+        "class_means": {clas: round(sum(x) / len(x), 2) for clas, x in class_levels.items()},
+        "class_max": {clas: max(x) for clas, x in class_levels.items()},
+        "mono_classes": sum(1 for character in roster if len(character.classes) == 1),
+        "subclasses": {clas: dict(counts) for clas, counts in subclasses.items()},
+    }
+
+
+def comparable(summary) -> dict:
+    return {
+        "total": summary.total,
+        "races": summary.races,
+        "level_mean": summary.level_mean,
+        "level_median": summary.level_percentiles[50],
+        "tiers": summary.tiers,
+        "stat_means": summary.stat_means,
+        "stat_min": summary.stat_min,
+        "classes": summary.classes,
+        "class_means": summary.class_means,
+        "class_max": summary.class_max,
+        "mono_classes": summary.mono_classes,
+        "subclasses": summary.subclasses,
+    }
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--characters", type=int, default=50000)
+    args = parser.parse_args()
+
+    roster = make_roster(args.characters)
+    aggregates = RosterAggregates()
+    _, load = timed(aggregates.roster_reset, roster)
+    summary, first = timed(aggregates.summary)
+    _, memoized = timed(aggregates.summary)
+    aggregates.roster_updated([roster[0].id], [roster[0]])
+    _, after_write = timed(aggregates.summary)
+    expected, loops = timed(summarize_loops, roster)
+    assert comparable(summary) == expected, "RosterAggregates disagrees with the Python loops"
+
+    print(f"{args.characters} characters")
+    print(f"  load into arrays: {load * 1000:8.1f} ms")
+    print(f"  summary:          {first * 1000:8.1f} ms")
+    print(f"  memoized summary: {memoized * 1e6:8.1f} us")
+    print(f"  after one write:  {after_write * 1000:8.1f} ms")
+    print(f"  python loops:     {loops * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
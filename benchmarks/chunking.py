@@ -0,0 +1,81 @@
+"""
+Time to chunk megabyte-scale text: ``chunk_text`` against the recursive chunker it replaced, at the sizes Discord
+limits callers to (1024 for embed fields, 2000 for messages and 4096 for embed descriptions).
+
+    python -m benchmarks.chunking [--megabytes 4] [--repeat 3]
+"""
+import argparse
+import random
+import time
+
+from utils.functions import chunk_text
+
+SEPARATORS = ("\n\n", "\n", ". ", ", ", " ")
+SIZES = (1024, 2000, 4096)
+
+
+def recursive_chunk_text(text, max_chunk_size=1024, chunk_on=SEPARATORS, chunker_i=0):
+    """The recursive chunker ``iter_chunks`` replaced, for reference."""
+    if len(text) <= max_chunk_size:
+        return [text]
+    if chunker_i >= len(chunk_on):
+        return [
+            text[:max_chunk_size],
+            *recursive_chunk_text(text[max_chunk_size:], max_chunk_size, chunk_on, chunker_i + 1),
+        ]
+
+    chunks = []
+    split_char = chunk_on[chunker_i]
+    for chunk in text.split(split_char):
+        chunk = f"{chunk}{split_char}"
+        if len(chunk) > max_chunk_size:
+            chunks.extend(recursive_chunk_text(chunk, max_chunk_size, chunk_on, chunker_i + 1))
+        elif chunks and len(chunk) + len(chunks[-1]) <= max_chunk_size:
+            chunks[-1] += chunk
+        else:
+            chunks.append(chunk)
+
+    if chunks[-1] == split_char:
+        chunks.pop()
+
+    chunks[-1] = chunks[-1][: -len(split_char)]
+    return chunks
+
+
+def make_texts(megabytes: float) -> dict[str, str]:
+    rng = random.Random(0)
+    length = int(megabytes * 2**20)
+    words = [rng.choice(("arcane", "the", "strike", "creature", "saving", "throw", "a")) for _ in range(length // 6)]
+    prose = []
+    while sum(map(len, prose)) < length:
+        sentence = " ".join(rng.choices(words[:1000], k=rng.randint(4, 20)))
+        prose.append(sentence + rng.choice((". ", ", ", ".\n", ".\n\n")))
+    return {"words": " ".join(words)[:length], "prose": "".join(prose)[:length]}
+
+
+def best_of(repeat: int, func, *args) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--megabytes", type=float, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{args.megabytes} MiB of text, best of {args.repeat}")
+    for name, text in make_texts(args.megabytes).items():
+        for size in SIZES:
+            assert chunk_text(text, size) == recursive_chunk_text(text, size), "chunk_text disagrees with the reference"
+            old = best_of(args.repeat, recursive_chunk_text, text, size)
+            new = best_of(args.repeat, chunk_text, text, size)
+            print(f"{name:>6} at {size:>4}: recursive {old * 1000:7.1f} ms, chunk_text {new * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Latency of roster reads while a bulk write transaction is open, with the engine from ``db`` (WAL, synchronous=NORMAL,
+busy_timeout and the rest of its pragmas) against an engine with SQLite's default settings.
+
+    python -m benchmarks.db_concurrency [--characters 20000] [--write-seconds 3] [--readers 4]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+from datetime import datetime, timedelta
+
+# db creates its engine on import, so point it at a scratch database first
+_directory = tempfile.mkdtemp()
+os.environ["DB_URI"] = f"sqlite+aiosqlite:///{os.path.join(_directory, 'tuned.db')}"
+
+from sqlalchemy import func, insert, select, update  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+
+import db  # noqa: E402
+import migrations  # noqa: E402
+from models import Character, User  # noqa: E402
+from utils.roster import roster_filter  # noqa: E402
+
+
+async def populate(engine, characters: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(migrations.migrate, db.Base.metadata)
+        now = datetime.now()
+        await conn.execute(
+            insert(User),
+            [
+                {"id": i, "name": f"player{i}", "nickname": f"Player {i}", "lastActive": now - timedelta(days=i % 120)}
+                for i in range(1, characters + 1)
+            ],
+        )
+        await conn.execute(
+            insert(Character),
+            [
+                {
+                    "id": i,
+                    "user_id": i,
+                    "name": f"Character {i}",
+                    "url": f"https://www.dndbeyond.com/characters/{i}",
+                    "level": i % 20 + 1,
+                    "race": "Wood Elf",
+                    "classes": {"Bard": i % 20 + 1},
+                    "subclasses": {},
+                    "stats": {"STR": 10},
+                    "feats": [],
+                    "invocations": [],
+                    "valid": True,
+                }
+                for i in range(1, characters + 1)
+            ],
+        )
+
+
+async def bulk_write(engine, seconds: float, started: asyncio.Event):
+    """
+    Holds one write transaction open for *seconds*, repeatedly rewriting every character. Rewriting the names also
+    rewrites their characters_fts rows, so the transaction outgrows the page cache as a real refresh does.
+    """
+    loop = asyncio.get_running_loop()
+    async with engine.begin() as conn:
+        started.set()
+        end = loop.time() + seconds
+        while loop.time() < end:
+            await conn.execute(update(Character).values(name=Character.name + ""))
+            await asyncio.sleep(0.05)
+
+
+async def read(engine, done: asyncio.Event, latencies: list[float], errors: list[str]):
+    loop = asyncio.get_running_loop()
+    stmt = roster_filter(select(func.count(Character.id)))
+    while not done.is_set():
+        start = loop.time()
+        try:
+            async with engine.connect() as conn:
+                await conn.scalar(stmt)
+        except OperationalError as e:
+            errors.append(str(e.orig))
+            continue
+        latencies.append(loop.time() - start)
+
+
+async def measure(engine, seconds: float, readers: int) -> tuple[list[float], list[str]]:
+    latencies, errors = [], []
+    started, done = asyncio.Event(), asyncio.Event()
+    writer = asyncio.create_task(bulk_write(engine, seconds, started))
+    await started.wait()
+    tasks = [asyncio.create_task(read(engine, done, latencies, errors)) for _ in range(readers)]
+    await writer
+    done.set()
+    await asyncio.gather(*tasks)
+    return latencies, errors
+
+
+async def main(args):
+    default = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(_directory, 'default.db')}")
+    for name, engine in (("db.engine", db.engine), ("defaults", default)):
+        await populate(engine, args.characters)
+        latencies, errors = await measure(engine, args.write_seconds, args.readers)
+        await engine.dispose()
+        if latencies:
+            p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+            print(
+                f"{name:>9}: {len(latencies):5} reads, p50 {statistics.median(latencies) * 1000:7.1f} ms, "
+                f"p95 {p95 * 1000:7.1f} ms, max {max(latencies) * 1000:7.1f} ms, {len(errors)} errors"
+            )
+        else:
+            print(f"{name:>9}: no reads completed, {len(errors)} errors")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--characters", type=int, default=20000)
+    parser.add_argument("--write-seconds", type=float, default=3)
+    parser.add_argument("--readers", type=int, default=4)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,58 @@
+"""
+Parse time and peak memory of DDB character responses: ``json.loads`` into the full dict, as ``resp.json()`` does,
+against validating the raw bytes into the slim ``utils.ddbmodels`` projections, as ``get_character(slim=True)`` does.
+
+    python -m benchmarks.ddb_parse [--characters 200]
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from benchmarks.payloads import character_response
+from utils.ddbmodels import AvraeStats, DDBCharacterResponse
+
+
+def parse_full(responses: list[tuple[bytes, bytes]]) -> list:
+    return [(json.loads(char), json.loads(avrae)) for char, avrae in responses]
+
+
+def parse_slim(responses: list[tuple[bytes, bytes]]) -> list:
+    return [
+        (
+            DDBCharacterResponse.model_validate_json(char).model_dump(exclude_unset=True),
+            AvraeStats.model_validate_json(avrae).model_dump(exclude_unset=True),
+        )
+        for char, avrae in responses
+    ]
+
+
+def measure(parse, responses) -> tuple[float, float]:
+    """Seconds to parse every response, and the peak MiB allocated while the results are held."""
+    start = time.perf_counter()
+    parse(responses)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    results = parse(responses)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+    return elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--characters", type=int, default=200)
+    args = parser.parse_args()
+
+    responses = [character_response(seed) for seed in range(args.characters)]
+    size = sum(len(char) + len(avrae) for char, avrae in responses) / 2**20
+    print(f"{args.characters} characters, {size:.1f} MiB of responses")
+    for name, parse in (("full dict", parse_full), ("slim model", parse_slim)):
+        elapsed, peak = measure(parse, responses)
+        print(f"{name:>10}: {elapsed * 1000:8.1f} ms  {peak:7.1f} MiB peak")
+
+
+if __name__ == "__main__":
+    main()
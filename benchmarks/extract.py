@@ -0,0 +1,152 @@
+"""
+Time to derive every field we use from DDB character payloads: the per-field walkers ``extract_character``
+replaced, each re-walking the payload, against its single pass.
+
+    python -m benchmarks.extract [--characters 200] [--repeat 5]
+"""
+import argparse
+import re
+import time
+
+from benchmarks.payloads import make_character
+from utils.constants import SUBCLASS_REPLACEMENTS
+from utils.functions import extract_character
+
+# The walkers as they were, for reference
+
+
+def get_classes(data: dict) -> (dict[str, int], dict[str, str]):
+    classes = {}
+    subclasses = {}
+    for _class in data["classes"]:
+        cur_class = _class["definition"]["name"]
+        classes[cur_class] = _class["level"]
+        if _class["subclassDefinition"]:
+            sub_name = _class["subclassDefinition"]["name"]
+            subclasses[cur_class] = re.sub(rf"""{"|".join(SUBCLASS_REPLACEMENTS)}""", "", sub_name)
+    return classes, subclasses
+
+
+def get_tools(data: dict) -> (list[str], list[str]):
+    profs = []
+    expertise = []
+    for _type in data.get("modifiers", {}):
+        for modifier in data["modifiers"][_type]:
+            if modifier["entityTypeId"] == 2103445194:
+                if modifier["type"] == "proficiency":
+                    profs.append(modifier["friendlySubtypeName"])
+                if modifier["type"] == "expertise":
+                    expertise.append(modifier["friendlySubtypeName"])
+    return profs, expertise
+
+
+def get_languages(data: dict) -> list[str]:
+    languages = []
+    for _type in data.get("modifiers", {}):
+        for modifier in data["modifiers"][_type]:
+            if modifier["entityTypeId"] == 906033267:
+                languages.append(modifier["friendlySubtypeName"])
+    return languages
+
+
+def get_invocations(data: dict) -> list[str]:
+    invocations = []
+    for _type in data["options"]:
+        if not data["options"][_type]:
+            continue
+        for option in data["options"][_type]:
+            if option["componentId"] == 10292364 and option["componentTypeId"] == 12168134:
+                invocations.append(option["definition"]["name"])
+    return invocations
+
+
+def get_feats(data: dict) -> list[str]:
+    feats = []
+    for _feat in data["feats"]:
+        feat_name = re.sub(r"^\d+:", "", _feat["definition"]["name"]).strip()
+        if any(
+            re.match(x, feat_name)
+            for x in ["Ability Score Improvement", r".+ Ability Score Improvements", "Weapon Mastery", "Dark Bargain"]
+        ):
+            continue
+        feats.append(feat_name)
+    return feats
+
+
+def get_stats(data: dict) -> dict[str, int]:
+    return {stat: data["avrae"]["stats"][stat.lower()]["score"] for stat in ["STR", "DEX", "CON", "INT", "WIS", "CHA"]}
+
+
+def get_bags(data: dict) -> list:
+    out = {"Backpack": {}, "Equipment": {}, "Magical Items": {}, "Consumables": {}, "Harvest": {}}
+    for item in data["inventory"]:
+        bag_name = "Backpack"
+        if item["definition"]["magic"]:
+            bag_name = "Magical Items"
+        elif item["definition"]["canEquip"]:
+            bag_name = "Equipment"
+        elif item["definition"]["isConsumable"]:
+            bag_name = "Consumables"
+        item_name = item["definition"]["name"]
+        out[bag_name][item_name] = out[bag_name].get(item_name, 0) + item["quantity"]
+    return list(out.items())
+
+
+def walk(data: dict) -> dict:
+    classes, subclasses = get_classes(data)
+    tools, expertise = get_tools(data)
+    return {
+        "classes": classes,
+        "subclasses": subclasses,
+        "stats": get_stats(data),
+        "invocations": get_invocations(data),
+        "feats": get_feats(data),
+        "tools": tools,
+        "expertise": expertise,
+        "languages": get_languages(data),
+        "bags": get_bags(data),
+    }
+
+
+def extract(data: dict) -> dict:
+    snapshot = extract_character(data)
+    return {
+        "classes": dict(snapshot.classes),
+        "subclasses": dict(snapshot.subclasses),
+        "stats": dict(snapshot.stats),
+        "invocations": list(snapshot.invocations),
+        "feats": list(snapshot.feats),
+        "tools": list(snapshot.tools),
+        "expertise": list(snapshot.expertise),
+        "languages": list(snapshot.languages),
+        "bags": [(bag_name, dict(items)) for bag_name, items in snapshot.bags],
+    }
+
+
+def best_of(repeat: int, func, payloads: list[dict]) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for data in payloads:
+            func(data)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--characters", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    payloads = [make_character(seed) for seed in range(args.characters)]
+    assert all(walk(data) == extract(data) for data in payloads), "extract_character disagrees with the walkers"
+
+    print(f"{args.characters} characters, best of {args.repeat}")
+    for name, func in (("walkers", walk), ("single pass", extract_character)):
+        elapsed = best_of(args.repeat, func, payloads)
+        print(f"{name:>11}: {elapsed * 1000:7.1f} ms  ({elapsed / len(payloads) * 1e6:6.1f} us per character)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Synthetic DDB character payloads for the benchmarks, shaped like the responses of the character service: the
+fields ``utils.ddbmodels`` declares, surrounded by the bulk of everything it doesn't (descriptions, spells,
+actions, modifier and item definitions).
+"""
+import json
+import random
+
+from utils.functions import INVOCATION_COMPONENT, LANGUAGE_ENTITY_TYPE_ID, TOOL_ENTITY_TYPE_ID
+
+CLASSES = ("Bard", "Cleric", "Fighter", "Rogue", "Warlock", "Wizard")
+ABILITIES = ("str", "dex", "con", "int", "wis", "cha")
+WORDS = ("the", "arcane", "strike", "until", "creature", "saving", "throw")
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _modifier(rng: random.Random) -> dict:
+    entity_type = rng.choice((TOOL_ENTITY_TYPE_ID, LANGUAGE_ENTITY_TYPE_ID, 1472902489, 1958004211))
+    return {
+        "fixedValue": None,
+        "id": f"{rng.getrandbits(40)}",
+        "entityId": rng.randint(1, 100),
+        "entityTypeId": entity_type,
+        "type": rng.choice(("proficiency", "expertise", "bonus", "language")),
+        "subType": _text(rng, 2).replace(" ", "-"),
+        "dice": None,
+        "restriction": _text(rng, 6),
+        "statId": None,
+        "requiresAttunement": False,
+        "duration": None,
+        "friendlyTypeName": "Proficiency",
+        "friendlySubtypeName": _text(rng, 2).title(),
+        "isGranted": True,
+        "bonusTypes": [],
+        "value": None,
+        "availableToMulticlass": True,
+        "modifierTypeId": 1,
+        "modifierSubTypeId": rng.randint(1, 2000),
+        "componentId": rng.randint(1, 10**6),
+        "componentTypeId": rng.randint(1, 10**6),
+    }
+
+
+def _definition(rng: random.Random, name: str) -> dict:
+    return {
+        "id": rng.randint(1, 10**6),
+        "name": name,
+        "description": _text(rng, 120),
+        "snippet": _text(rng, 30),
+        "sources": [{"sourceId": rng.randint(1, 100), "pageNumber": rng.randint(1, 300)}],
+    }
+
+
+def _item(rng: random.Random) -> dict:
+    definition = _definition(rng, rng.choice(("Rope", "Torch", "Potion of Healing", "Longsword", "Ring of Warmth")))
+    definition.update(
+        magic=rng.random() < 0.2,
+        canEquip=rng.random() < 0.4,
+        isConsumable=rng.random() < 0.3,
+        weight=rng.randint(0, 20),
+        cost=rng.randint(0, 500),
+        tags=["Utility", "Exploration"],
+        grantedModifiers=[_modifier(rng) for _ in range(rng.randint(0, 3))],
+    )
+    return {"id": rng.getrandbits(40), "quantity": rng.randint(1, 5), "equipped": False, "definition": definition}
+
+
+def make_character(seed: int = 0, items: int = 120, modifiers: int = 60, spells: int = 80) -> dict:
+    """A character payload, as the parsed ``data`` of a character service response plus its Avrae stats."""
+    rng = random.Random(seed)
+    classes = [
+        {
+            "level": rng.randint(1, 10),
+            "definition": _definition(rng, clas),
+            "subclassDefinition": _definition(rng, f"Oath of {_text(rng, 1).title()}") if rng.random() < 0.7 else None,
+            "classFeatures": [{"definition": _definition(rng, _text(rng, 2).title())} for _ in range(15)],
+        }
+        for clas in rng.sample(CLASSES, rng.randint(1, 3))
+    ]
+
+    def option(component: tuple[int, int]) -> dict:
+        return {
+            "componentId": component[0],
+            "componentTypeId": component[1],
+            "definition": _definition(rng, _text(rng, 3).title()),
+        }
+
+    return {
+        "id": seed,
+        "name": f"Character {seed}",
+        "race": {**_definition(rng, "Wood Elf"), "fullName": "Wood Elf", "racialTraits": []},
+        "classes": classes,
+        "feats": [{"definition": _definition(rng, _text(rng, 2).title())} for _ in range(rng.randint(0, 6))],
+        "options": {
+            "class": [option(INVOCATION_COMPONENT) for _ in range(rng.randint(0, 8))]
+            + [option((1, 2)) for _ in range(10)],
+            "race": [option((3, 4)) for _ in range(3)],
+            "feat": None,
+        },
+        "modifiers": {
+            bucket: [_modifier(rng) for _ in range(modifiers // 6)]
+            for bucket in ("race", "class", "background", "item", "feat", "condition")
+        },
+        "inventory": [_item(rng) for _ in range(items)],
+        "spells": {"class": [_definition(rng, _text(rng, 2).title()) for _ in range(spells)]},
+        "actions": {"class": [_definition(rng, _text(rng, 2).title()) for _ in range(20)]},
+        "notes": {"backstory": _text(rng, 400), "personalityTraits": _text(rng, 60)},
+        "avrae": {"stats": {ability: {"score": rng.randint(8, 20)} for ability in ABILITIES}},
+    }
+
+
+def character_response(seed: int = 0, **kwargs) -> tuple[bytes, bytes]:
+    """The raw ``(character, avrae)`` response bodies for a character, as the DDB client receives them."""
+    data = make_character(seed, **kwargs)
+    avrae = data.pop("avrae")
+    return json.dumps({"id": seed, "success": True, "data": data}).encode(), json.dumps(avrae).encode()
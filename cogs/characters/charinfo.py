@@ -4,14 +4,7 @@ from disnake import ApplicationCommandInteraction
 
 from disnake.ext import commands
 
-from utils.functions import (
-    get_character_data,
-    get_tools,
-    get_languages,
-    get_feats,
-    get_invocations,
-    get_bags,
-)
+from utils.functions import get_character_data, extract_character
 
 logger = logging.getLogger(__name__)
 
@@ -53,25 +46,26 @@ class CharInfo(commands.Cog):
             await inter.send(f"Issue loading character:\n - {error}")
             return
 
+        snapshot = extract_character(data)
         out = []
 
-        if tools and any(tools := get_tools(data)):
-            prof, exp = tools
-            if prof:
-                out.append(f"!cvar pTools {','.join(prof)}")
-            if exp:
-                out.append(f"!cvar eTools {','.join(exp)}")
+        if tools:
+            if snapshot.tools:
+                out.append(f"!cvar pTools {','.join(snapshot.tools)}")
+            if snapshot.expertise:
+                out.append(f"!cvar eTools {','.join(snapshot.expertise)}")
 
-        if languages and (languages := get_languages(data)):
-            out.append(f"!cvar languages {','.join(languages)}")
+        if languages and snapshot.languages:
+            out.append(f"!cvar languages {','.join(snapshot.languages)}")
 
-        if feats and (feats := get_feats(data)):
-            out.append(f"!cvar feats {','.join(feats)}")
+        if feats and snapshot.feats:
+            out.append(f"!cvar feats {','.join(snapshot.feats)}")
 
-        if invocations and (invocations := get_invocations(data)):
-            out.append(f"!cvar invocations {','.join(invocations)}")
+        if invocations and snapshot.invocations:
+            out.append(f"!cvar invocations {','.join(snapshot.invocations)}")
 
-        if bags and (bags := get_bags(data)):
+        if bags:
+            bags = [(bag_name, dict(items)) for bag_name, items in snapshot.bags]
             out.append(f"!cvar bags {json.dumps(bags, separators=(',', ':'))})")
             out.append(
                 """!cvar bagSettings {"weightlessBags": ["bag of holding", "handy haversack", "heward's handy haversack"], "customWeights": {}, "weightTracking": "Off", "openMode": "One", "encumbrance": "Off"}"""
@@ -6,25 +6,31 @@ from utils.avrae_api import AvraeClient
 
 import json
 import logging
-import time
-from collections import Counter
 import re
+from contextlib import aclosing
 from datetime import datetime, timedelta
 from datetime import time as dt_time
 from textwrap import dedent
 
-import aiohttp
-
 import disnake
 from disnake import ApplicationCommandInteraction
 
 from disnake.ext import commands, tasks
-from sqlalchemy import select
+from sqlalchemy import case, func, select
 from sqlalchemy.exc import NoResultFound
 
 import db
-from utils.ddbclient import DDBClient
-from utils.constants import GUILD_IDS, BEARER_TOKEN, MAGIC_ITEM_SHEET_ID
+from utils.aggregates import aggregate_store
+from utils.batcher import WriteBehindBatcher
+from utils.concurrency import bounded_map
+from utils.constants import DB_BATCH_SIZE, GUILD_IDS, MAGIC_ITEM_SHEET_ID, REFRESH_WORKERS
+from utils.fulltext import uses_fts
+from utils.httpclient import CircuitOpen, HTTPException
+from utils.charsearch import compile_search, search_characters
+from utils.roster import roster_filter, sync_character_children
+from utils.rostercache import roster_cache
+from utils.scheduler import Priority
+from utils.search_index import search_index
 
 from models import Character, User
 from utils.functions import (
@@ -32,10 +38,7 @@ from utils.functions import (
     split_arg,
     natural_join,
     pluralize,
-    get_classes,
-    get_invocations,
-    get_feats,
-    get_stats,
+    extract_character,
     char_disp,
 )
 
@@ -66,10 +69,7 @@ class ProvideUserModal(disnake.ui.Modal):
 class NLPCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.avrae_client = AvraeClient(
-            aiohttp.ClientSession(loop=bot.loop), constants.AVRAE_TOKEN
-        )
-        self.client = DDBClient(aiohttp.ClientSession(loop=bot.loop), BEARER_TOKEN)
+        self.avrae_client = AvraeClient(constants.AVRAE_TOKEN)
         self.nlp_update_stats.start()
 
     @tasks.loop(time=dt_time(hour=12))
@@ -85,6 +85,8 @@ class NLPCommands(commands.Cog):
         )
         await self.nlp_get_active(server=server, days=8, response=log_message)
         await self.nlp_update_character(inter=log_message)
+        # Reloaded in full by the next read, rather than trusting a week of incremental updates
+        roster_cache.invalidate()
 
     # noinspection PyTypeChecker
     @commands.slash_command(name="nlp_update_magic_items")
@@ -366,7 +368,7 @@ class NLPCommands(commands.Cog):
                 old_char = old_chars.one()
                 old_char.user_id = None
             except NoResultFound:
-                ...
+                old_char = None
 
             character = Character(
                 name="",
@@ -385,8 +387,10 @@ class NLPCommands(commands.Cog):
             session.add(character)
             await session.commit()
 
+        # The new character is only written again if its fetch below succeeds, so pick it up now
+        await roster_cache.refresh([character.id] + ([old_char.id] if old_char else []))
         await self.nlp_update_character(
-            user_ids=[user.id], active_only=False, valid_only=False
+            user_ids=[user.id], active_only=False, valid_only=False, priority=Priority.INTERACTIVE
         )
 
         await inter.send(
@@ -533,9 +537,16 @@ class NLPCommands(commands.Cog):
             char.user = user
 
             session.add(char)
+            await session.flush()
+            if not uses_fts():
+                await sync_character_children(
+                    session, [{"id": char.id, "classes": classes, "subclasses": {}, "feats": []}]
+                )
             await session.commit()
 
-        await self.nlp_update_character(user_ids=[owner.id])
+        await roster_cache.refresh([char.id])
+
+        await self.nlp_update_character(user_ids=[owner.id], priority=Priority.INTERACTIVE)
 
         await inter.send(
             f"Added {owner.mention} as {name}, approved at <t:{int(datetime.now().timestamp())}:R>",
@@ -645,32 +656,16 @@ class NLPCommands(commands.Cog):
     @nlp_character_lookup_multiple.autocomplete("name_5")
     @nlp_character_lookup_multiple.autocomplete("name_6")
     async def slash_rule_auto(self, _, user_input: str):
-        characters = await self.get_all_characters(active_only=False)
-        choices = [
-            i.user.nickname
-            for i in characters
-            if user_input.lower()
-            in f"{i.name} 〰 {i.user.nickname if i.user else ''}".lower()
-        ]
-        return choices[:25]
+        return await search_index.search(user_input, limit=25)
 
     @commands.slash_command(name="nlp_subclasses", guild_ids=GUILD_IDS)
     async def nlp_subclass(self, inter: ApplicationCommandInteraction):
         """Gets subclass breakdown for the all active characters."""
-        characters = await self.get_all_characters()
-
-        subclasses = {}
-        classes = {}
-
-        for char in characters:
-            for clas, sub in char.subclasses.items():
-                subclasses[clas] = subclasses.get(clas, []) + [sub]
-            for clas, lvl in char.classes.items():
-                classes[clas] = classes.get(clas, 0) + 1
-
-        subclasses = dict(
-            sorted(subclasses.items(), key=lambda x: len(set(x[1])), reverse=True)
-        )
+        await aggregate_store.ensure()
+        summary = aggregate_store.summary()
+        total_characters = summary.total
+        classes = summary.classes
+        subclasses = summary.subclasses
 
         embed = disnake.Embed(
             title="NLP Subclasses",
@@ -680,13 +675,11 @@ class NLPCommands(commands.Cog):
         )
 
         embed.set_footer(
-            text=f"Data for the {len(characters)} Active characters within 90 days of"
+            text=f"Data for the {total_characters} Active characters within 90 days of"
         )
 
         for clas, subs in subclasses.items():
-            total = len(subs)
-            subs = dict(Counter(subs))
-            subs = dict(sorted(subs.items(), key=lambda x: x[1], reverse=True))
+            total = sum(subs.values())
             subs = [f"> *{sub}:* {count}" for sub, count in subs.items()]
             embed.add_field(
                 name=f"{clas} ({total}/{classes[clas]})",
@@ -700,128 +693,31 @@ class NLPCommands(commands.Cog):
     async def nlp_stats(self, inter: ApplicationCommandInteraction):
         """Gets stats for active characters, comparing levels, classes, ancestries, and more!"""
 
-        characters = await self.get_all_characters()
+        await aggregate_store.ensure()
+        summary = aggregate_store.summary()
+        total = summary.total
 
-        total_stats = {"STR": 0, "DEX": 0, "CON": 0, "INT": 0, "WIS": 0, "CHA": 0}
-
-        max_stats = {
-            "STR": [-99, ""],
-            "DEX": [-99, ""],
-            "CON": [-99, ""],
-            "INT": [-99, ""],
-            "WIS": [-99, ""],
-            "CHA": [-99, ""],
-        }
-
-        min_stats = {
-            "STR": [99, ""],
-            "DEX": [99, ""],
-            "CON": [99, ""],
-            "INT": [99, ""],
-            "WIS": [99, ""],
-            "CHA": [99, ""],
-        }
-        total_level = 0
-        levels = []
-        races = []
-        classes = {}
-        classes_each = {}
-        mono_classes = 0
-        most_multiclass = 0
-        for character in characters:
-            # Race
-
-            race_standardization = {
-                "Half-Elf": "Half-Elf",
-                "Elf": "Elf",
-                "Dwarf": "Dwarf",
-                "Tiefling": "Tiefling",
-                "Genasi": "Genasi",
-                "Human": "Human",
-                "Dragonborn": "Dragonborn",
-            }
-            race = character.race
-            for key, value in race_standardization.items():
-                if key in race:
-                    race = value
-                    break
-            races.append(race)
-
-            # Level
-            total_level += character.level
-            levels.append(character.level)
-
-            # Classes
-            for clas, lvl in character.classes.items():
-                classes[clas] = classes.get(clas, 0) + 1
-                classes_each[clas] = classes_each.get(clas, []) + [lvl]
-            if len(character.classes) == 1:
-                mono_classes += 1
-            if len(character.classes) > most_multiclass:
-                most_multiclass = len(character.classes)
-
-            # Stats
-            for stat in character.stats:
-                total_stats[stat] += character.stats[stat]
-                if max_stats[stat][0] < character.stats[stat]:
-                    max_stats[stat] = [character.stats[stat], character.name]
-                elif max_stats[stat][0] == character.stats[stat]:
-                    max_stats[stat][1] += f", {character.name}"
-
-                if min_stats[stat][0] > character.stats[stat]:
-                    min_stats[stat] = [character.stats[stat], character.name]
-                elif min_stats[stat][0] == character.stats[stat]:
-                    min_stats[stat][1] += f", {character.name}"
-
-        races = dict(Counter(races))
-        races = dict(sorted(races.items(), key=lambda x: x[1], reverse=True))
+        races = summary.races
         single_race = [race for race, count in races.items() if count == 1]
 
-        classes = dict(Counter(classes))
-        classes = dict(sorted(classes.items(), key=lambda x: x[1], reverse=True))
-        classes_avg = {
-            cls: round(sum(lvls) / len(lvls), 2) for cls, lvls in classes_each.items()
-        }
-        classes_avg = dict(
-            sorted(classes_avg.items(), key=lambda x: x[1], reverse=True)
-        )
-        classes_max = {cls: max(lvls) for cls, lvls in classes_each.items()}
-        classes_max = dict(
-            sorted(classes_max.items(), key=lambda x: x[1], reverse=True)
-        )
+        classes = summary.classes
+        classes_avg = summary.class_means
+        classes_max = summary.class_max
+        mono_classes = summary.mono_classes
+        most_multiclass = summary.most_multiclass
 
-        levels = dict(Counter(levels))
-        levels = dict(sorted(levels.items(), key=lambda x: x[0], reverse=True))
-        average_levels = round(total_level / len(characters), 2)
+        levels = summary.levels
+        average_levels = summary.level_mean
+        average_stats = summary.stat_means
+        min_stats = summary.stat_min
+        max_stats = summary.stat_max
 
-        average_stats = {
-            name: round(value / len(characters), 2)
-            for name, value in total_stats.items()
-        }
-
-        tiers = {
-            1: [(level, count) for level, count in levels.items() if 5 > level],
-            2: [(level, count) for level, count in levels.items() if 5 <= level < 11],
-            3: [(level, count) for level, count in levels.items() if 11 <= level < 17],
-            4: [(level, count) for level, count in levels.items() if 17 <= level],
-        }
-
-        sum_each_tier = {
-            tier: sum([count for level, count in levels])
-            for tier, levels in tiers.items()
-        }
-        average_each_tier = {
-            tier: round(
-                sum([level * count for level, count in levels]) / sum_each_tier[tier], 2
-            )
-            if sum_each_tier[tier]
-            else 0
-            for tier, levels in tiers.items()
-        }
+        sum_each_tier = {tier: count for tier, (count, _) in summary.tiers.items()}
+        average_each_tier = {tier: average for tier, (_, average) in summary.tiers.items()}
 
         embed = disnake.Embed(title="NLP Stats", timestamp=datetime.now())
         embed.set_footer(
-            text=f"Data for the {len(characters)} Active characters within 90 days of"
+            text=f"Data for the {total} Active characters within 90 days of"
         )
 
         embed.add_field(
@@ -847,12 +743,12 @@ class NLPCommands(commands.Cog):
             f"**{stat}:** {value}" for stat, value in average_stats.items()
         ]
         min_stats_out = [
-            f"**{stat}:** {value[0]} ({len(value[1].split(', '))} {pluralize('char', len(value[1].split(', ')))})"
-            for stat, value in min_stats.items()
+            f"**{stat}:** {value} ({count} {pluralize('char', count)})"
+            for stat, (value, count) in min_stats.items()
         ]
         max_stats_out = [
-            f"**{stat}:** {value[0]} ({len(value[1].split(', '))} {pluralize('char', len(value[1].split(', ')))})"
-            for stat, value in max_stats.items()
+            f"**{stat}:** {value} ({count} {pluralize('char', count)})"
+            for stat, (value, count) in max_stats.items()
         ]
 
         embed.add_field(
@@ -862,6 +758,17 @@ class NLPCommands(commands.Cog):
                                {" ".join(average_stats_out[3:])}"""),
             inline=False,
         )
+        level_percentiles = [
+            f"**{percentile}th:** {value:g}" for percentile, value in summary.level_percentiles.items()
+        ]
+        median_stats_out = [f"**{stat}:** {value:g}" for stat, value in summary.stat_medians.items()]
+        embed.add_field(
+            "Level Percentiles and Median Stats",
+            dedent(f"""{" ".join(level_percentiles)}
+                               {" ".join(median_stats_out[:3])}
+                               {" ".join(median_stats_out[3:])}"""),
+            inline=False,
+        )
         embed.add_field(
             "Minimum Stats",
             dedent(f"""{" ".join(min_stats_out[:3])}
@@ -902,6 +809,8 @@ class NLPCommands(commands.Cog):
         race: str = commands.param(default=None),
         cls: str = commands.param(name="class", default=None),
         subcls: str = commands.param(name="subclass", default=None),
+        feat: str = commands.param(default=None),
+        invocation: str = commands.param(default=None),
         level: str = commands.param(default=None),
         stats: str = commands.param(default=None),
     ):
@@ -916,101 +825,54 @@ class NLPCommands(commands.Cog):
         race: Races to search for. Partial matching, ignores case, comma separated. (e.g. "Elf, Dwarf")
         cls: Class names to search for. Partial matching, ignores case, comma separated (e.g. "Barb, Wizard")
         subcls: Subclass names to search for. Partial matching, ignores case, comma separated (e.g. "Wild, Frenzy")
+        feat: Feat names to search for. Partial matching, ignores case, comma separated (e.g. "Lucky, War Caster")
+        invocation: Eldritch Invocations to search for. Partial matching, ignores case, comma separated (e.g. "Agonizing")
         level: Levels to search for. Can be a single number, or a comparison (e.g. ">=5, <10")
         stats: Stats to search for. Abbreviated stat name:number or comparison (e.g. "STR:15, DEX:>=12")
         """
-        characters = await self.get_all_characters()
-
         desc = ""
 
+        # column -> terms, matched together against the full-text index
+        filters = {}
+
         names = split_arg(name)
         if names:
             desc += f"- **Name Contains:** {natural_join(names, 'or', '*')}\n"
-            characters = [
-                character
-                for character in characters
-                if any([True for n in names if n in character.name.lower()])
-            ]
+            filters["name"] = names
 
         players = split_arg(player)
         if players:
             desc += f"- **Player Contains:** {natural_join(players, 'or', '*')}\n"
-            characters = [
-                character
-                for character in characters
-                if any(
-                    [
-                        True
-                        for n in players
-                        if n in character.user.nickname.lower()
-                        or n in character.user.name.lower()
-                    ]
-                )
-            ]
+            filters["player"] = players
 
         races = split_arg(race)
         if races:
             desc += f"- **Race Contains:** {natural_join(races, 'or', '*')}\n"
-            characters = [
-                character
-                for character in characters
-                if any([True for n in races if n in character.race.lower()])
-            ]
+            filters["race"] = races
 
         clss = split_arg(cls)
         if clss:
             desc += f"- **Classes Include:** {natural_join(clss, 'or', '*')}\n"
-            characters = [
-                character
-                for character in characters
-                if any(
-                    [
-                        True
-                        for n in clss
-                        if any(n in x.lower() for x in character.classes.keys())
-                    ]
-                )
-            ]
+            filters["classes"] = clss
 
         subclss = split_arg(subcls)
         if subclss:
             desc += f"- **Subclasses Includes:** {natural_join(subclss, 'or', '*')}\n"
-            characters = [
-                character
-                for character in characters
-                if any(
-                    [
-                        True
-                        for n in subclss
-                        if any(n in x.lower() for x in character.subclasses.values())
-                    ]
-                )
-            ]
+            filters["subclasses"] = subclss
+
+        feats = split_arg(feat)
+        if feats:
+            desc += f"- **Feats Include:** {natural_join(feats, 'or', '*')}\n"
+            filters["feats"] = feats
+
+        invocations = split_arg(invocation)
+        if invocations:
+            desc += f"- **Invocations Include:** {natural_join(invocations, 'or', '*')}\n"
+            filters["invocations"] = invocations
 
         levels = split_arg(level)
         if levels:
             desc += f"- **Level Is:** {natural_join(levels, 'or', '*')}\n"
-            characters = [
-                character
-                for character in characters
-                if any(
-                    [
-                        True
-                        for n in levels
-                        if (n.isdigit() and int(n) == character.level)
-                        or (
-                            n.startswith(">=")
-                            and character.level >= int(n.strip("<=>"))
-                        )
-                        or (n.startswith(">") and character.level > int(n.strip("<=>")))
-                        or (
-                            n.startswith("<=")
-                            and character.level <= int(n.strip("<=>"))
-                        )
-                        or (n.startswith("<") and character.level < int(n.strip("<=>")))
-                    ]
-                )
-            ]
 
         statss = split_arg(stats)
         statss = [
@@ -1018,62 +880,21 @@ class NLPCommands(commands.Cog):
         ]
         if statss:
             desc += f"- **Stats are:** {natural_join([f'{stat[0]} {stat[1]}' for stat in statss], 'or', '*')}\n"
-            characters = [
-                character
-                for character in characters
-                if any(
-                    [
-                        True
-                        for n in statss
-                        if n[0] in character.stats
-                        and (n[1].isdigit() and int(n[1]) == character.stats[n[0]])
-                        or (
-                            n[1].startswith(">=")
-                            and character.stats[n[0]] >= int(n[1].strip("<=>"))
-                        )
-                        or (
-                            n[1].startswith(">")
-                            and character.stats[n[0]] > int(n[1].strip("<=>"))
-                        )
-                        or (
-                            n[1].startswith("<=")
-                            and character.stats[n[0]] <= int(n[1].strip("<=>"))
-                        )
-                        or (
-                            n[1].startswith("<")
-                            and character.stats[n[0]] < int(n[1].strip("<=>"))
-                        )
-                    ]
-                )
-            ]
+
+        stmt = compile_search(filters, levels, statss)
+        async with db.async_session() as session:
+            characters, total = await search_characters(session, stmt, limit=20)
 
         embed = disnake.Embed(title="Character Search")
-        for char in characters[:20]:
-            extended = len(characters) <= 5
+        for char in characters:
+            extended = total <= 5
             title, value = char_disp(char, extended=extended)
             embed.add_field(name=title, value=value, inline=True)
 
-        embed.description = f"{'20/' if len(characters) > 20 else ''}{len(characters)} {pluralize('result', len(characters))} for the following search:\n{desc}"
+        embed.description = f"{'20/' if total > 20 else ''}{total} {pluralize('result', total)} for the following search:\n{desc}"
 
         await inter.send(embed=embed, allowed_mentions=disnake.AllowedMentions().none())
 
-    @staticmethod
-    async def get_all_characters(active_only: bool = True) -> list[Character]:
-        """
-        Get all characters available in the database.
-        :param active_only: If enabled, will only grab characters active in the last 90 days.
-        :return:
-        """
-        delta = datetime.now() - timedelta(days=90)
-        async with db.async_session() as session:
-            stmt = select(Character).join(User).where(User.onServer)
-            if active_only:
-                stmt = stmt.where(User.lastActive >= delta)
-            characters = await session.scalars(stmt)
-            characters = characters.all()
-
-        return characters
-
     @staticmethod
     async def nlp_get_active(
         server: disnake.Guild,
@@ -1125,24 +946,43 @@ class NLPCommands(commands.Cog):
 
         response = await response.edit(f"{response.content}\nSaving")
 
+        rows = []
+        for author, time in authors.items():
+            member = server.get_member(author)
+            rows.append(
+                {
+                    "id": author,
+                    "lastActive": time,
+                    "onServer": bool(member),
+                    "name": member.name if member else None,
+                    "nickname": member.nick if member else None,
+                }
+            )
+
         async with db.async_session() as session:
-            for author, time in authors.items():
-                try:
-                    stmt = select(User).where(User.id == author)
-                    user_objs = await session.scalars(stmt)
-                    user_obj = user_objs.one()
-                except NoResultFound:
-                    # User has left the server or has no validated character
-                    user_obj = User(id=author)
-                member = server.get_member(author)
-                user_obj.lastActive = time
-                user_obj.onServer = bool(member)
-                if member:
-                    user_obj.name = member.name
-                    user_obj.nickname = member.nick
-                session.add(user_obj)
+            for i in range(0, len(rows), DB_BATCH_SIZE):
+                stmt = db.insert(User).values(rows[i : i + DB_BATCH_SIZE])
+                excluded = stmt.excluded
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[User.id],
+                    set_={
+                        "lastActive": db.greatest(
+                            func.coalesce(User.lastActive, excluded.lastActive),
+                            excluded.lastActive,
+                        ),
+                        "onServer": excluded.onServer,
+                        # Members who have left keep the names we last knew them by
+                        "name": case((excluded.onServer, excluded.name), else_=User.name),
+                        "nickname": case(
+                            (excluded.onServer, excluded.nickname), else_=User.nickname
+                        ),
+                    },
+                )
+                await session.execute(stmt)
             await session.commit()
 
+        # Activity moves characters in and out of the active roster wholesale, so reload rather than patch
+        roster_cache.invalidate()
         await response.edit(f"{response.content}\nFinished!")
 
     async def nlp_update_character(
@@ -1151,36 +991,80 @@ class NLPCommands(commands.Cog):
         valid_only: bool = True,
         user_ids: list[int] = None,
         inter: ApplicationCommandInteraction | disnake.Message = None,
+        priority: Priority = Priority.BATCH,
     ):
-        """Grabs the current data from DDB for a character and updates that character in our database."""
-        delta = datetime.now() - timedelta(days=90)
+        """
+        Grabs the current data from DDB for a character and updates that character in our database.
+
+        Batch refreshes skip characters that were recently unavailable, see ``NegativeCache``. Pass
+        ``Priority.INTERACTIVE`` when someone is waiting on the result, to always refetch them.
+        """
         errors = []
         async with db.async_session() as session:
-            stmt = select(Character).join(User).where(User.onServer)
+            stmt = roster_filter(select(Character), active_only)
             if user_ids:
                 stmt = stmt.filter(User.id.in_(user_ids))
-            if active_only:
-                stmt = stmt.where(User.lastActive >= delta)
             if valid_only:
                 stmt = stmt.where(Character.valid)
             result = await session.execute(stmt)
             characters = result.scalars().all()
 
-            response = None
-            msg = f"Grabbing {len(characters)} Characters\n0/{len(characters)}"
-            if isinstance(inter, disnake.ApplicationCommandInteraction):
-                response = await inter.followup.send(msg)
-            elif inter:
-                response = await inter.edit(f"{inter.content}\n{msg}")
+        response = None
+        msg = f"Grabbing {len(characters)} Characters\n0/{len(characters)}"
+        if isinstance(inter, disnake.ApplicationCommandInteraction):
+            response = await inter.followup.send(msg)
+        elif inter:
+            response = await inter.edit(f"{inter.content}\n{msg}")
+        response_content = response.content if response else msg
 
-            for i, character in enumerate(characters, start=1):
+        async def fetch(character: Character):
+            try:
+                # Hedging is for interactive latency, duplicating the slowest of a bulk refresh only adds load
+                return await get_character_data(
+                    self.bot,
+                    character.url,
+                    refresh=True,
+                    hedge=priority == Priority.INTERACTIVE,
+                    priority=priority,
+                )
+            except HTTPException as e:
+                # Timeouts and the like are transient, so don't mark the character as invalid over them
+                return None, e
+
+        # Results are written in short transactions as they arrive, rather than holding one open for the whole run.
+        # Where search uses character_classes and character_feats, they're rewritten in the same transaction.
+        on_flush = None if uses_fts() else sync_character_children
+
+        saved = 0
+        invalidated = 0
+
+        async def on_commit(rows: list[dict]):
+            nonlocal saved, invalidated
+            # Refreshed characters are written with their new fingerprint, invalidations only flip valid
+            changed = sum("fingerprint" in row for row in rows)
+            saved += changed
+            invalidated += len(rows) - changed
+            await roster_cache.refresh([row["id"] for row in rows])
+
+        # Closing the generator cancels the workers still fetching, should the loop stop early
+        async with (
+            WriteBehindBatcher(Character, on_flush=on_flush, on_commit=on_commit) as batcher,
+            aclosing(bounded_map(fetch, characters, REFRESH_WORKERS)) as results,
+        ):
+            i = 0
+            unavailable = 0
+            unchanged = 0
+            async for character, (data, error) in results:
+                i += 1
                 if i % 5 == 0 or i == len(characters):
                     if response:
                         response_content = re.sub(
                             r"\d+/\d+", f"{i}/{len(characters)}", response.content
                         )
                         response = await response.edit(response_content)
-                data, error = await get_character_data(self.bot, character.url)
+                if isinstance(error, CircuitOpen):
+                    unavailable += 1
+                    continue
                 if error:
                     error_out = (
                         f"Error with the following Character:\n"
@@ -1191,12 +1075,11 @@ class NLPCommands(commands.Cog):
                     )
                     logger.warning(error_out)
                     logger.debug(f" - {data}")
-                    character.valid = False
+                    if character.valid and not isinstance(error, HTTPException):
+                        await batcher.add({"id": character.id, "valid": False})
                     errors.append(f"```md\n{error_out}\n```")
                     continue
 
-                time.sleep(1)
-
                 if "classes" not in data:
                     error_out = (
                         f"Error with the following Character:\n"
@@ -1206,35 +1089,35 @@ class NLPCommands(commands.Cog):
                     )
                     logger.warning(error_out)
                     logger.debug(f" - {data}")
-                    character.valid = False
+                    if character.valid:
+                        await batcher.add({"id": character.id, "valid": False})
                     errors.append(f"```md\n{error_out}\n```")
                     continue
 
-                classes, subclasses = get_classes(data)
-                stats = get_stats(data)
-                invocations = get_invocations(data)
-                feats = get_feats(data)
-
-                level = sum(classes.values())
-                race = data["race"]["fullName"]
-                name = data['name']
-
-                character.name = name
-                character.level = level
-                character.race = race
-                character.classes = classes
-                character.subclasses = subclasses
-                character.stats = stats
-                character.invocations = invocations
-                character.feats = feats
-                character.valid = True
-
-                session.add(character)
+                snapshot = extract_character(data)
+                fingerprint = snapshot.fingerprint()
+                if character.valid and character.fingerprint == fingerprint:
+                    unchanged += 1
+                    continue
+                await batcher.add(
+                    {
+                        "id": character.id,
+                        **snapshot.columns(),
+                        "valid": True,
+                        "fingerprint": fingerprint,
+                    }
+                )
 
-            await session.commit()
+        if unavailable:
+            errors.append(
+                f"Skipped {unavailable} {pluralize('character', unavailable)} while DDB was unavailable."
+            )
 
         if response:
-            response = await response.edit(response_content + "\nSaved")
+            response = await response.edit(
+                f"{response_content}\nSaved {saved} changed {pluralize('character', saved)}, {unchanged} unchanged, "
+                f"{invalidated} marked invalid"
+            )
             reply = response
             for error in errors:
                 reply = await reply.reply(error, allowed_mentions=disnake.AllowedMentions().none())
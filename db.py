@@ -1,9 +1,44 @@
+from sqlalchemy import event, func, text
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
-from utils.constants import DB_URI
+import migrations
+from utils.constants import (
+    DB_URI,
+    DB_MAX_OVERFLOW,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    SQLITE_BUSY_TIMEOUT,
+    SQLITE_CACHE_SIZE,
+    SQLITE_MMAP_SIZE,
+)
+
+engine = create_async_engine(
+    DB_URI,
+    echo=False,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_pre_ping=True,
+)
+
+if engine.dialect.name == "sqlite":
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, _):
+        """
+        WAL lets reads carry on during a write transaction, and with it synchronous=NORMAL is still crash safe.
+        busy_timeout makes a second writer wait for the lock rather than failing immediately.
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+        cursor.close()
 
-engine = create_async_engine(DB_URI, echo=False)
 async_session = sessionmaker(
     autocommit=False,
     autoflush=False,
@@ -15,6 +50,23 @@ async_session = sessionmaker(
 Base = declarative_base()
 
 
+def insert(table):
+    """An INSERT for *table* supporting ``on_conflict_do_update``, for whichever dialect is in use."""
+    if engine.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def greatest(*args):
+    """The largest of *args*, which is the multi-argument ``max()`` on SQLite."""
+    if engine.dialect.name == "postgresql":
+        return func.greatest(*args)
+    return func.max(*args)
+
+
 async def init_db():
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+        await conn.run_sync(migrations.migrate, Base.metadata)
+        if engine.dialect.name == "sqlite":
+            # Without statistics, the planner takes the boolean onServer index to be as selective as lastActive
+            await conn.execute(text("ANALYZE"))
\ No newline at end of file
@@ -0,0 +1,164 @@
+"""
+A small versioned migration runner. The schema version is kept in the ``schema_version`` table, and each migration
+brings an existing database up from the previous version. Fresh databases are created from the models as they are
+now, so they're stamped with the latest version and skip the migrations entirely.
+
+To change the schema, update the models and append a migration to ``MIGRATIONS`` that makes the same change to an
+existing database.
+"""
+import json
+import logging
+from typing import Callable
+
+from sqlalchemy import Connection, MetaData, inspect, text
+
+logger = logging.getLogger(__name__)
+
+
+def _add_roster_indexes(conn: Connection):
+    """Index the columns every roster query filters or joins on."""
+    conn.execute(text('CREATE INDEX IF NOT EXISTS "ix_users_lastActive" ON users ("lastActive")'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS "ix_users_onServer" ON users ("onServer")'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS "ix_users_nickname" ON users (nickname)'))
+    conn.execute(text('CREATE INDEX IF NOT EXISTS "ix_characters_user_id" ON characters (user_id)'))
+
+
+def _add_character_fingerprint(conn: Connection):
+    """Add characters.fingerprint, for skipping unchanged characters on refresh."""
+    conn.execute(text("ALTER TABLE characters ADD COLUMN fingerprint VARCHAR"))
+
+
+def _backfill_character_children(conn: Connection):
+    """Fill character_classes and character_feats from the JSON columns of characters. Not SQLite."""
+    if conn.dialect.name == "sqlite":  # Searched through characters_fts instead, so they're left empty
+        return
+    rows = conn.execute(text("SELECT id, classes, subclasses, feats FROM characters")).all()
+
+    def load(value):
+        # SQLite hands JSON back as text, PostgreSQL already parsed
+        return json.loads(value) if isinstance(value, str) else value
+
+    classes = []
+    feats = []
+    for char_id, char_classes, char_subclasses, char_feats in rows:
+        char_subclasses = load(char_subclasses) or {}
+        for class_name, level in (load(char_classes) or {}).items():
+            classes.append(
+                {"id": char_id, "class_name": class_name, "subclass": char_subclasses.get(class_name), "level": level}
+            )
+        feats.extend({"id": char_id, "feat": feat} for feat in set(load(char_feats) or ()))
+
+    conn.execute(text("DELETE FROM character_classes"))
+    conn.execute(text("DELETE FROM character_feats"))
+    if classes:
+        conn.execute(
+            text(
+                "INSERT INTO character_classes (character_id, class_name, subclass, level) "
+                "VALUES (:id, :class_name, :subclass, :level)"
+            ),
+            classes,
+        )
+    if feats:
+        conn.execute(text("INSERT INTO character_feats (character_id, feat) VALUES (:id, :feat)"), feats)
+
+
+# The search fields of a character ``c``, in the column order of characters_fts
+_CHARACTER_FTS_ROW = """
+    SELECT c.id, c.name, c.race,
+        (SELECT coalesce(u.nickname, '') || ', ' || coalesce(u.name, '') FROM users u WHERE u.id = c.user_id),
+        (SELECT group_concat(key, ', ') FROM json_each(c.classes)),
+        (SELECT group_concat(value, ', ') FROM json_each(c.subclasses)),
+        (SELECT group_concat(value, ', ') FROM json_each(c.feats)),
+        (SELECT group_concat(value, ', ') FROM json_each(c.invocations))
+    FROM characters c
+"""
+_CHARACTER_FTS_INSERT = (
+    "INSERT INTO characters_fts (rowid, name, race, player, classes, subclasses, feats, invocations)"
+    + _CHARACTER_FTS_ROW
+)
+
+
+def _create_character_fts(conn: Connection):
+    """Add the characters_fts full-text index, kept up to date by triggers. SQLite only."""
+    if conn.dialect.name != "sqlite":
+        return
+    conn.execute(
+        text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS characters_fts USING fts5("
+            "name, race, player, classes, subclasses, feats, invocations, tokenize='trigram')"
+        )
+    )
+    conn.execute(
+        text(
+            "CREATE TRIGGER IF NOT EXISTS characters_fts_insert AFTER INSERT ON characters BEGIN "
+            f"{_CHARACTER_FTS_INSERT} WHERE c.id = new.id; "
+            "END"
+        )
+    )
+    conn.execute(
+        text(
+            "CREATE TRIGGER IF NOT EXISTS characters_fts_update "
+            "AFTER UPDATE OF name, race, classes, subclasses, feats, invocations, user_id ON characters BEGIN "
+            "DELETE FROM characters_fts WHERE rowid = old.id; "
+            f"{_CHARACTER_FTS_INSERT} WHERE c.id = new.id; "
+            "END"
+        )
+    )
+    conn.execute(
+        text(
+            "CREATE TRIGGER IF NOT EXISTS characters_fts_delete AFTER DELETE ON characters BEGIN "
+            "DELETE FROM characters_fts WHERE rowid = old.id; "
+            "END"
+        )
+    )
+    conn.execute(
+        text(
+            "CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF name, nickname ON users BEGIN "
+            "UPDATE characters_fts SET player = coalesce(new.nickname, '') || ', ' || coalesce(new.name, '') "
+            "WHERE rowid IN (SELECT id FROM characters WHERE user_id = new.id); "
+            "END"
+        )
+    )
+    conn.execute(text("DELETE FROM characters_fts"))
+    conn.execute(text(_CHARACTER_FTS_INSERT))
+
+
+# (version, migration), in order. Never edit or remove a released migration, only append new ones.
+MIGRATIONS: list[tuple[int, Callable[[Connection], None]]] = [
+    (1, _add_roster_indexes),
+    (2, _add_character_fingerprint),
+    (3, _backfill_character_children),
+    (4, _create_character_fts),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(conn: Connection) -> int:
+    conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+    version = conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar()
+    return version or 0
+
+
+def set_version(conn: Connection, version: int):
+    conn.execute(text("DELETE FROM schema_version"))
+    conn.execute(text("INSERT INTO schema_version (version) VALUES (:version)"), {"version": version})
+
+
+def migrate(conn: Connection, metadata: MetaData):
+    """Creates any missing tables from *metadata*, then applies pending migrations. Run inside a transaction."""
+    fresh = not inspect(conn).has_table("characters")
+    metadata.create_all(conn)
+
+    version = get_version(conn)
+    if fresh:
+        # Virtual tables and triggers can't be described by the models, so still need creating
+        _create_character_fts(conn)
+        set_version(conn, LATEST_VERSION)
+        return
+
+    for target, migration in MIGRATIONS:
+        if target <= version:
+            continue
+        logger.info(f"Migrating database to version {target}: {migration.__doc__}")
+        migration(conn)
+        set_version(conn, target)
@@ -27,9 +27,9 @@ class User(Base):
 
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=True)
-    nickname = Column(String, nullable=True)
-    lastActive = Column(DateTime, nullable=True)
-    onServer = Column(Boolean, nullable=True, default=True)
+    nickname = Column(String, nullable=True, index=True)
+    lastActive = Column(DateTime, nullable=True, index=True)
+    onServer = Column(Boolean, nullable=True, default=True, index=True)
 
 
 class Character(Base):
@@ -48,6 +48,7 @@ class Character(Base):
         feats (dict): A JSON array listing the feats of the character. This field is required.
         invocations (dict): A JSON array listing the invocations of the character. This field is required.
         valid (bool): Indicates whether the character is valid. Defaults to True.
+        fingerprint (str): A hash of the data last refreshed from DDB, to skip rewriting unchanged characters.
         user_id (int): The foreign key that relates the character to a user.
 
     Relationships:
@@ -66,6 +67,63 @@ class Character(Base):
     feats = Column(JSON, nullable=False)
     invocations = Column(JSON, nullable=False)
     valid = Column(Boolean, nullable=False, default=True)
-    user_id = Column(Integer, ForeignKey('users.id'))
+    fingerprint = Column(String, nullable=True)
+    user_id = Column(Integer, ForeignKey('users.id'), index=True)
 
     user = relationship("User", lazy="joined")
+
+
+class UnavailableCharacter(Base):
+    """
+    A DDB character that recently returned an error status, like a private (403) or deleted (404) sheet. Lookups are
+    skipped until nextCheck, with the wait doubling after each consecutive failure.
+
+    Attributes:
+        id (int): The DDB character id.
+        status_code (int): The HTTP status code of the most recent failure.
+        failures (int): The number of consecutive failures.
+        lastChecked (datetime): When the character was last looked up.
+        nextCheck (datetime): When the character may next be looked up.
+    """
+    __tablename__ = 'unavailable_characters'
+
+    id = Column(Integer, primary_key=True)
+    status_code = Column(Integer, nullable=False)
+    failures = Column(Integer, nullable=False, default=1)
+    lastChecked = Column(DateTime, nullable=False)
+    nextCheck = Column(DateTime, nullable=False)
+
+
+class CharacterClass(Base):
+    """
+    One class of a character, normalized out of ``Character.classes`` and ``Character.subclasses`` so they can be
+    searched in SQL. Kept in sync with the JSON columns by ``utils.roster.sync_character_children``, but only on
+    databases without the characters_fts index (i.e. not SQLite), see ``utils.fulltext.uses_fts``.
+
+    Attributes:
+        character_id (int): The character with this class.
+        class_name (str): The name of the class.
+        subclass (str): The name of the subclass, if the character has one yet.
+        level (int): The character's level in this class.
+    """
+    __tablename__ = 'character_classes'
+
+    character_id = Column(Integer, ForeignKey('characters.id', ondelete='CASCADE'), primary_key=True)
+    class_name = Column(String, primary_key=True, index=True)
+    subclass = Column(String, nullable=True, index=True)
+    level = Column(Integer, nullable=False)
+
+
+class CharacterFeat(Base):
+    """
+    One feat of a character, normalized out of ``Character.feats``. Kept in sync with the JSON column by
+    ``utils.roster.sync_character_children``, on the same databases as ``CharacterClass``.
+
+    Attributes:
+        character_id (int): The character with this feat.
+        feat (str): The name of the feat.
+    """
+    __tablename__ = 'character_feats'
+
+    character_id = Column(Integer, ForeignKey('characters.id', ondelete='CASCADE'), primary_key=True)
+    feat = Column(String, primary_key=True, index=True)
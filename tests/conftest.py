@@ -0,0 +1,26 @@
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+# db creates its engine on import, so point it at a scratch database before any test module imports it
+os.environ["DB_URI"] = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'nlp.db')}"
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def run():
+    """Runs a coroutine to completion, closing the database connections opened on its event loop."""
+
+    def run(coro):
+        async def wrapper():
+            try:
+                return await coro
+            finally:
+                await db.engine.dispose()
+
+        return asyncio.run(wrapper())
+
+    return run
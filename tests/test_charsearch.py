@@ -0,0 +1,165 @@
+import operator
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert
+
+import db
+from models import Character, User
+from utils.charsearch import compile_search, search_characters
+from utils.functions import STAT_NAMES
+from utils.roster import ACTIVE_DAYS
+
+CLASSES = ("Barbarian", "Bard", "Cleric", "Fighter", "Rogue", "Warlock", "Wizard")
+SUBCLASSES = ("Wild Magic", "Lore", "Forge", "Battle Master", "Arcane Trickster", "Fiend", "Evocation")
+FEATS = ("War Caster", "Lucky", "Alert", "Fey Touched", "Tough", "Sharpshooter")
+INVOCATIONS = ("Agonizing Blast", "Devil's Sight", "Mask of Many Faces", "Repelling Blast")
+RACES = ("Wood Elf", "High Elf", "Hill Dwarf", "Human", "Tiefling")
+NAMES = ("Alaric", "Brakka", "Cinder", "Dorn", "Elowen", "Fen", "Grim")
+COMPARISONS = {">=": operator.ge, "<=": operator.le, ">": operator.gt, "<": operator.lt}
+
+
+def make_roster(rng: random.Random, size: int = 150) -> tuple[list[dict], list[dict]]:
+    now = datetime.now()
+    users = [
+        {
+            "id": i,
+            "name": f"{rng.choice(NAMES).lower()}{i}",
+            "nickname": f"{rng.choice(NAMES)} the {rng.choice(RACES)}",
+            # Some players have gone quiet, or left, and drop out of the active roster
+            "lastActive": now - timedelta(days=rng.choice((1, 30, ACTIVE_DAYS + 10))),
+            "onServer": rng.random() < 0.9,
+        }
+        for i in range(1, size + 1)
+    ]
+    characters = []
+    for i in range(1, size + 1):
+        classes = {clas: rng.randint(1, 8) for clas in rng.sample(CLASSES, rng.randint(1, 3))}
+        characters.append(
+            {
+                "id": i,
+                "user_id": i,
+                "name": f"{rng.choice(NAMES)} {rng.choice(NAMES)}",
+                "url": f"https://www.dndbeyond.com/characters/{i}",
+                "race": rng.choice(RACES),
+                "level": sum(classes.values()),
+                "classes": classes,
+                "subclasses": {clas: rng.choice(SUBCLASSES) for clas in classes if rng.random() < 0.6},
+                "stats": {stat: rng.randint(8, 20) for stat in STAT_NAMES} if rng.random() < 0.95 else {},
+                "feats": rng.sample(FEATS, rng.randint(0, 2)),
+                "invocations": rng.sample(INVOCATIONS, rng.randint(0, 2)) if "Warlock" in classes else [],
+                "valid": True,
+            }
+        )
+    return users, characters
+
+
+def random_term(rng: random.Random, values: tuple[str, ...]) -> str:
+    """A lowercase piece of one of *values*, as typed into ``/nlp_search``, sometimes too short for a trigram."""
+    value = rng.choice(values).lower()
+    length = rng.randint(2, min(6, len(value)))
+    start = rng.randint(0, len(value) - length)
+    return value[start : start + length]
+
+
+def python_search(users, characters, filters, levels, stats) -> set[int]:
+    """The filtering ``/nlp_search`` did in Python over the active roster, before it was compiled to SQL."""
+    users = {user["id"]: user for user in users}
+    cutoff = datetime.now() - timedelta(days=ACTIVE_DAYS)
+    matches = [c for c in characters if users[c["user_id"]]["onServer"] and users[c["user_id"]]["lastActive"] >= cutoff]
+
+    def any_contains(terms, values):
+        return any(term in value.lower() for term in terms for value in values)
+
+    def compare(term, value):
+        for symbol, op in COMPARISONS.items():
+            if term.startswith(symbol):
+                return op(value, int(term.strip("<=>")))
+        return term.isdigit() and int(term) == value
+
+    if "name" in filters:
+        matches = [c for c in matches if any_contains(filters["name"], [c["name"]])]
+    if "player" in filters:
+        matches = [
+            c
+            for c in matches
+            if any_contains(filters["player"], [users[c["user_id"]]["nickname"], users[c["user_id"]]["name"]])
+        ]
+    if "race" in filters:
+        matches = [c for c in matches if any_contains(filters["race"], [c["race"]])]
+    if "classes" in filters:
+        matches = [c for c in matches if any_contains(filters["classes"], c["classes"].keys())]
+    if "subclasses" in filters:
+        matches = [c for c in matches if any_contains(filters["subclasses"], c["subclasses"].values())]
+    if "feats" in filters:
+        matches = [c for c in matches if any_contains(filters["feats"], c["feats"])]
+    if "invocations" in filters:
+        matches = [c for c in matches if any_contains(filters["invocations"], c["invocations"])]
+    if levels:
+        matches = [c for c in matches if any(compare(term, c["level"]) for term in levels)]
+    if stats:
+        matches = [
+            c for c in matches if any(stat in c["stats"] and compare(term, c["stats"][stat]) for stat, term in stats)
+        ]
+    return {c["id"] for c in matches}
+
+
+def random_search(rng: random.Random) -> tuple[dict, list[str], list[tuple[str, str]]]:
+    sources = {
+        "name": NAMES,
+        "player": NAMES + RACES,
+        "race": RACES,
+        "classes": CLASSES,
+        "subclasses": SUBCLASSES,
+        "feats": FEATS,
+        "invocations": INVOCATIONS,
+    }
+    # Mostly the class, subclass, feat and invocation filters, alone and in combination
+    columns = rng.sample(["classes", "subclasses", "feats", "invocations"], rng.randint(1, 3))
+    if rng.random() < 0.3:
+        columns.append(rng.choice(["name", "player", "race"]))
+    filters = {column: [random_term(rng, sources[column]) for _ in range(rng.randint(1, 2))] for column in columns}
+    levels = [f"{rng.choice(['', *COMPARISONS])}{rng.randint(1, 20)}"] if rng.random() < 0.3 else []
+    stats = []
+    if rng.random() < 0.3:
+        stats = [(rng.choice(STAT_NAMES), f"{rng.choice(['', *COMPARISONS])}{rng.randint(8, 20)}")]
+    return filters, levels, stats
+
+
+async def clear_roster():
+    async with db.async_session() as session:
+        for model in (Character, User):
+            await session.execute(delete(model))
+        await session.commit()
+
+
+async def compare_searches(seed: int, searches: int) -> list:
+    rng = random.Random(seed)
+    users, characters = make_roster(rng)
+    await db.init_db()
+    await clear_roster()
+    async with db.async_session() as session:
+        await session.execute(insert(User), users)
+        await session.execute(insert(Character), characters)
+        await session.commit()
+
+    mismatches = []
+    matched = 0
+    async with db.async_session() as session:
+        for _ in range(searches):
+            filters, levels, stats = random_search(rng)
+            stmt = compile_search(filters, levels, stats)
+            found, total = await search_characters(session, stmt, limit=len(characters))
+            expected = python_search(users, characters, filters, levels, stats)
+            matched += bool(expected)
+            if {character.id for character in found} != expected or total != len(expected):
+                mismatches.append((filters, levels, stats))
+    # Leave the shared database as the other tests expect to find it
+    await clear_roster()
+    assert matched > searches // 4, "too few searches matched anything to tell the two apart"
+    return mismatches
+
+
+def test_compiled_search_matches_python_filters(run):
+    for seed in range(3):
+        assert run(compare_searches(seed, 150)) == []
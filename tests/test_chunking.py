@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from utils.functions import chunk_text, iter_chunks
+
+SEPARATORS = ("\n\n", "\n", ". ", ", ", " ")
+
+
+def recursive_chunk_text(text, max_chunk_size=1024, chunk_on=SEPARATORS, chunker_i=0):
+    """The recursive chunker ``iter_chunks`` replaced, as the reference its output must match."""
+    if len(text) <= max_chunk_size:
+        return [text]
+    if chunker_i >= len(chunk_on):
+        return [
+            text[:max_chunk_size],
+            *recursive_chunk_text(text[max_chunk_size:], max_chunk_size, chunk_on, chunker_i + 1),
+        ]
+
+    chunks = []
+    split_char = chunk_on[chunker_i]
+    for chunk in text.split(split_char):
+        chunk = f"{chunk}{split_char}"
+        if len(chunk) > max_chunk_size:
+            chunks.extend(recursive_chunk_text(chunk, max_chunk_size, chunk_on, chunker_i + 1))
+        elif chunks and len(chunk) + len(chunks[-1]) <= max_chunk_size:
+            chunks[-1] += chunk
+        else:
+            chunks.append(chunk)
+
+    if chunks[-1] == split_char:
+        chunks.pop()
+
+    chunks[-1] = chunks[-1][: -len(split_char)]
+    return chunks
+
+
+def random_text(rng: random.Random) -> str:
+    """Words, runs of separators and the occasional unbroken run, so every level of the chunker gets exercised."""
+    pieces = []
+    for _ in range(rng.randint(0, 400)):
+        roll = rng.random()
+        if roll < 0.6:
+            pieces.append("".join(rng.choices("abcdefg", k=rng.randint(1, 12))))
+        elif roll < 0.95:
+            pieces.append(rng.choice(SEPARATORS + (".", ",", "\n\n\n")))
+        else:
+            pieces.append("x" * rng.randint(20, 300))
+    return "".join(pieces)
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_matches_recursive_chunker(seed):
+    rng = random.Random(seed)
+    text = random_text(rng)
+    max_chunk_size = rng.choice((5, 16, 50, 100, 1024))
+    expected = recursive_chunk_text(text, max_chunk_size)
+
+    assert chunk_text(text, max_chunk_size) == expected
+    assert list(iter_chunks(text, max_chunk_size)) == expected
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_matches_recursive_chunker_with_custom_separators(seed):
+    rng = random.Random(seed)
+    text = random_text(rng)
+    chunk_on = tuple(rng.sample(SEPARATORS, rng.randint(1, len(SEPARATORS))))
+
+    assert chunk_text(text, 40, chunk_on) == recursive_chunk_text(text, 40, chunk_on)
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_chunks_fit(seed):
+    rng = random.Random(seed)
+    text = random_text(rng)
+
+    assert all(len(chunk) <= 30 for chunk in iter_chunks(text, 30))
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import utils.ddbclient
+from utils.ddbclient import DDBClient
+from utils.hosts import get_host
+from utils.httpclient import HTTPTimeout, http_pool
+from utils.scheduler import Priority
+
+BUDGET = 0.5
+
+
+async def time_lookup(monkeypatch, **kwargs) -> tuple[type | None, float]:
+    release = asyncio.Event()
+
+    async def slow_sheet(request):
+        await release.wait()
+        return web.json_response({"data": {}})
+
+    app = web.Application()
+    app.router.add_get("/{path:.*}", slow_sheet)
+    server = TestServer(app, host="127.0.0.1")
+    await server.start_server()
+    base = str(server.make_url("/"))
+    # Both the sheet and its Avrae stats come from the slow upstream
+    monkeypatch.setattr(utils.ddbclient, "AVRAE_SERVICE_BASE", base)
+    monkeypatch.setattr(DDBClient, "SERVICE_BASE", base)
+    monkeypatch.setattr(DDBClient, "INTERACTIVE_TIMEOUT", BUDGET)
+    monkeypatch.setattr(DDBClient, "CONCURRENCY_LIMITS", {"127.0.0.1": 1})
+    client = DDBClient("key")
+    # Keep the only slot busy with a batch fetch, so the interactive lookup has to queue for it
+    batch = asyncio.create_task(client.get_character("2", priority=Priority.BATCH, timeout=10))
+    await asyncio.sleep(0.1)
+
+    started = time.monotonic()
+    error = None
+    try:
+        await client.get_character("1", **kwargs)
+    except Exception as e:
+        error = type(e)
+    elapsed = time.monotonic() - started
+
+    release.set()
+    batch.cancel()
+    await asyncio.gather(batch, return_exceptions=True)
+    get_host("127.0.0.1").breaker.record_success()
+    await server.close()
+    await http_pool.close()
+    return error, elapsed
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"priority": Priority.INTERACTIVE}], ids=["default", "interactive"])
+def test_slow_interactive_lookup_fails_within_budget(run, monkeypatch, kwargs):
+    error, elapsed = run(time_lookup(monkeypatch, **kwargs))
+    assert error is HTTPTimeout
+    assert elapsed < BUDGET + 0.25
+
+
+def test_interactive_timeout_can_be_overridden(run, monkeypatch):
+    error, elapsed = run(time_lookup(monkeypatch, timeout=BUDGET * 2))
+    assert error is HTTPTimeout
+    assert BUDGET * 2 <= elapsed < BUDGET * 2 + 0.25
@@ -0,0 +1,74 @@
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from pydantic import BaseModel
+
+from utils.hosts import get_host
+from utils.httpclient import BaseClient, HTTPDecodeError, HTTPStatusException, http_pool
+from utils.retry import RetryPolicy
+
+
+class Sheet(BaseModel):
+    id: int
+
+
+class Client(BaseClient):
+    # Fails a request as soon as it isn't retried
+    RETRY_POLICY = RetryPolicy(max_attempts=1)
+
+
+async def serve(handler) -> TestServer:
+    app = web.Application()
+    app.router.add_get("/{path:.*}", handler)
+    server = TestServer(app, host="127.0.0.1")
+    await server.start_server()
+    return server
+
+
+async def request_until_open(handler, **kwargs) -> tuple[list[type], bool]:
+    server = await serve(handler)
+    client = Client()
+    client.SERVICE_BASE = str(server.make_url(""))
+    breaker = get_host("127.0.0.1").breaker
+    breaker.record_success()
+    errors = []
+    try:
+        for _ in range(breaker.failure_threshold + 1):
+            try:
+                await client.get("/sheet", **kwargs)
+            except Exception as e:
+                errors.append(type(e))
+        return errors, breaker.opened_at is not None
+    finally:
+        breaker.record_success()
+        await server.close()
+        await http_pool.close()
+
+
+async def maintenance_page(request):
+    return web.Response(text="<html>Down for maintenance</html>", content_type="text/html")
+
+
+async def wrong_shape(request):
+    return web.json_response({"name": "not a sheet"})
+
+
+async def overloaded(request):
+    return web.Response(status=503)
+
+
+@pytest.mark.parametrize(
+    "handler,kwargs",
+    [(maintenance_page, {}), (wrong_shape, {"response_model": Sheet})],
+    ids=["unparseable", "invalid"],
+)
+def test_decode_errors_leave_breaker_closed(run, handler, kwargs):
+    errors, opened = run(request_until_open(handler, **kwargs))
+    assert set(errors) == {HTTPDecodeError}
+    assert not opened
+
+
+def test_server_errors_open_breaker(run):
+    errors, opened = run(request_until_open(overloaded))
+    assert HTTPStatusException in errors
+    assert opened
@@ -0,0 +1,149 @@
+import json
+import random
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+from sqlalchemy import insert, select, text
+
+import db
+import migrations
+from migrations import LATEST_VERSION, MIGRATIONS, get_version, migrate
+from models import Character, User
+from utils.roster import roster_filter
+
+
+async def query_plan(stmt) -> str:
+    sql = str(stmt.compile(db.engine.sync_engine, compile_kwargs={"literal_binds": True}))
+    async with db.engine.connect() as conn:
+        rows = (await conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))).all()
+    return "\n".join(row.detail for row in rows)
+
+
+async def populated_plans() -> list[str]:
+    await db.init_db()
+    # Most players stay on the server, but only a fraction of them are recently active
+    rng = random.Random(0)
+    now = datetime.now()
+    async with db.engine.begin() as conn:
+        await conn.execute(text("DELETE FROM users"))
+        await conn.execute(
+            insert(User),
+            [
+                {
+                    "id": i,
+                    "name": f"player{i}",
+                    "nickname": f"Player {i}",
+                    "lastActive": now - timedelta(days=rng.randint(0, 1500)),
+                    "onServer": rng.random() < 0.8,
+                }
+                for i in range(1, 2001)
+            ],
+        )
+    # Startup refreshes the planner's statistics
+    await db.init_db()
+    return [
+        await query_plan(roster_filter(select(Character))),
+        await query_plan(select(Character).where(Character.user_id == 1)),
+    ]
+
+
+def test_roster_queries_use_indexes(run):
+    roster, lookup = run(populated_plans())
+    assert "USING INDEX ix_users_lastActive" in roster
+    assert "USING INDEX ix_characters_user_id" in roster
+    assert "USING INDEX ix_characters_user_id" in lookup
+
+
+# The users and characters tables as they were before versioned migrations: no indexes, and no schema_version
+BASELINE_SCHEMA = [
+    'CREATE TABLE users (id INTEGER NOT NULL PRIMARY KEY, name VARCHAR, nickname VARCHAR, "lastActive" DATETIME, '
+    '"onServer" BOOLEAN)',
+    "CREATE TABLE characters (id INTEGER NOT NULL PRIMARY KEY, name VARCHAR NOT NULL, url VARCHAR NOT NULL, "
+    "race VARCHAR NOT NULL, level INTEGER NOT NULL, stats JSON NOT NULL, classes JSON NOT NULL, "
+    "subclasses JSON NOT NULL, feats JSON NOT NULL, invocations JSON NOT NULL, valid BOOLEAN NOT NULL, "
+    "user_id INTEGER REFERENCES users (id))",
+]
+BASELINE_CHARACTERS = [
+    {
+        "id": 1,
+        "name": "Alaric Thorne",
+        "race": "Wood Elf",
+        "classes": {"Wizard": 5, "Fighter": 1},
+        "subclasses": {"Wizard": "Evocation"},
+        "feats": ["War Caster"],
+        "invocations": [],
+    },
+    {
+        "id": 2,
+        "name": "Cinder",
+        "race": "Tiefling",
+        "classes": {"Warlock": 6},
+        "subclasses": {"Warlock": "Fiend"},
+        "feats": [],
+        "invocations": ["Agonizing Blast"],
+    },
+]
+JSON_COLUMNS = ("classes", "subclasses", "feats", "invocations")
+
+
+def baseline_database(path) -> sa.Engine:
+    engine = sa.create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        for statement in BASELINE_SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO users (id, name, nickname, \"onServer\") VALUES (1, 'bob', 'Bobby', 1)"))
+        conn.execute(
+            text(
+                "INSERT INTO characters (id, name, url, race, level, stats, classes, subclasses, feats, invocations, "
+                "valid, user_id) VALUES (:id, :name, '', :race, 6, '{}', :classes, :subclasses, :feats, "
+                ":invocations, 1, 1)"
+            ),
+            [
+                {**character, **{key: json.dumps(character[key]) for key in JSON_COLUMNS}}
+                for character in BASELINE_CHARACTERS
+            ],
+        )
+    return engine
+
+
+def snapshot(conn: sa.Connection) -> dict:
+    """Everything a migration could have changed: the schema, the version, and the row counts of every table."""
+    schema = conn.execute(text("SELECT type, name, sql FROM sqlite_master ORDER BY type, name")).all()
+    tables = [name for kind, name, _ in schema if kind == "table" and not name.startswith("characters_fts_")]
+    return {
+        "schema": schema,
+        "version": get_version(conn),
+        "rows": {table: conn.execute(text(f'SELECT COUNT(*) FROM "{table}"')).scalar() for table in tables},
+    }
+
+
+def test_migrate_upgrades_baseline_database(tmp_path, monkeypatch):
+    engine = baseline_database(tmp_path / "baseline.db")
+    with engine.begin() as conn:
+        migrate(conn, db.Base.metadata)
+
+    with engine.connect() as conn:
+        assert get_version(conn) == LATEST_VERSION == 4
+        inspector = sa.inspect(conn)
+        assert "fingerprint" in {column["name"] for column in inspector.get_columns("characters")}
+        assert "ix_users_lastActive" in {index["name"] for index in inspector.get_indexes("users")}
+        assert "ix_characters_user_id" in {index["name"] for index in inspector.get_indexes("characters")}
+        # The existing characters were indexed for search, and are found through it
+        fts = conn.execute(text("SELECT rowid, player, classes, invocations FROM characters_fts ORDER BY rowid")).all()
+        assert fts == [(1, "Bobby, bob", "Wizard, Fighter", None), (2, "Bobby, bob", "Warlock", "Agonizing Blast")]
+        matches = conn.execute(text("SELECT rowid FROM characters_fts WHERE characters_fts MATCH 'evocation'")).all()
+        assert matches == [(1,)]
+        # SQLite searches through characters_fts, so the child tables are created but never backfilled
+        assert conn.execute(text("SELECT COUNT(*) FROM character_classes")).scalar() == 0
+        assert conn.execute(text("SELECT COUNT(*) FROM character_feats")).scalar() == 0
+        before = snapshot(conn)
+
+    ran = []
+    monkeypatch.setattr(
+        migrations, "MIGRATIONS", [(version, lambda conn, v=version: ran.append(v)) for version, _ in MIGRATIONS]
+    )
+    with engine.begin() as conn:
+        migrate(conn, db.Base.metadata)
+        assert ran == []
+        assert snapshot(conn) == before
+    engine.dispose()
@@ -0,0 +1,142 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects import postgresql
+
+import db
+import utils.fulltext
+from models import Character, CharacterClass, CharacterFeat, User
+from utils.charsearch import compile_search
+from utils.fulltext import _table_condition, text_condition
+from utils.roster import sync_character_children
+
+USERS = [
+    {"id": 1, "name": "alice", "nickname": "Ali"},
+    {"id": 2, "name": "bob", "nickname": "Bobby Tables"},
+    {"id": 3, "name": "carol", "nickname": "Caz"},
+    {"id": 4, "name": "dave", "nickname": "Dee"},
+]
+CHARACTERS = [
+    {
+        "id": 1,
+        "user_id": 1,
+        "name": "Alaric Thorne",
+        "race": "Wood Elf",
+        "classes": {"Wizard": 5, "Fighter": 1},
+        "subclasses": {"Wizard": "Evocation"},
+        "feats": ["War Caster", "Alert"],
+        "invocations": [],
+    },
+    {
+        "id": 2,
+        "user_id": 2,
+        "name": "Brakka",
+        "race": "Hill Dwarf",
+        "classes": {"Cleric": 7},
+        "subclasses": {"Cleric": "Forge"},
+        "feats": ["Tough"],
+        "invocations": [],
+    },
+    {
+        "id": 3,
+        "user_id": 3,
+        "name": "Cinder",
+        "race": "Tiefling",
+        "classes": {"Warlock": 6, "Sorcerer": 2},
+        "subclasses": {"Warlock": "Fiend", "Sorcerer": "Draconic Bloodline"},
+        "feats": ["Fey Touched"],
+        "invocations": ["Agonizing Blast", "Devil's Sight"],
+    },
+    {
+        "id": 4,
+        "user_id": 4,
+        "name": "Dob_100%",
+        "race": "Human",
+        "classes": {"Fighter": 3},
+        "subclasses": {},
+        "feats": [],
+        "invocations": [],
+    },
+]
+
+
+async def seed():
+    """Resets the database to ``USERS`` and ``CHARACTERS``, with their child table rows."""
+    await db.init_db()
+    now = datetime.now()
+    async with db.async_session() as session:
+        for model in (CharacterClass, CharacterFeat, Character, User):
+            await session.execute(delete(model))
+        await session.execute(insert(User), [{**user, "lastActive": now, "onServer": True} for user in USERS])
+        characters = [
+            {**character, "url": f"https://x/{character['id']}", "level": 1, "stats": {}, "valid": True}
+            for character in CHARACTERS
+        ]
+        await session.execute(insert(Character), characters)
+        # Only kept up to date where characters_fts doesn't exist, so fill them as those databases would be
+        await sync_character_children(session, CHARACTERS)
+        await session.commit()
+
+
+async def matching(condition) -> set[int]:
+    async with db.async_session() as session:
+        return set(await session.scalars(select(Character.id).where(condition)))
+
+
+async def search_both(filters: dict[str, list[str]]) -> tuple[set[int], set[int]]:
+    await seed()
+    return await matching(text_condition(filters)), await matching(_table_condition(filters))
+
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        ({"classes": ["fighter"]}, {1, 4}),
+        ({"classes": ["wiz", "cleric"]}, {1, 2}),
+        ({"subclasses": ["fiend"]}, {3}),
+        ({"subclasses": ["bloodline", "forge"]}, {2, 3}),
+        ({"feats": ["war caster"]}, {1}),
+        ({"feats": ["tou"]}, {2, 3}),
+        ({"invocations": ["devil's"]}, {3}),
+        ({"classes": ["fighter"], "feats": ["alert"]}, {1}),
+        ({"classes": ["warlock"], "subclasses": ["draconic"], "invocations": ["blast"]}, {3}),
+        ({"player": ["bobby"]}, {2}),
+        ({"player": ["ca"]}, {3}),
+        ({"name": ["_100%"]}, {4}),
+        ({"race": ["elf", "dwarf"]}, {1, 2}),
+        ({"classes": ["paladin"]}, set()),
+    ],
+)
+def test_search_paths_agree(run, filters, expected):
+    fts, tables = run(search_both(filters))
+    assert fts == expected
+    assert tables == expected
+
+
+def test_table_path_on_postgres(monkeypatch):
+    monkeypatch.setattr(utils.fulltext, "uses_fts", lambda: False)
+    stmt = compile_search(
+        {"classes": ["wiz"], "subclasses": ["fiend"], "feats": ["alert"], "invocations": ["blast"], "player": ["bo"]},
+        levels=[">5"],
+        stats=[("STR", ">=12")],
+    )
+    sql = " ".join(str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})).split())
+
+    assert "characters_fts" not in sql
+    assert (
+        "characters.id IN (SELECT character_classes.character_id FROM character_classes "
+        "WHERE (character_classes.class_name ILIKE '%%' || 'wiz' || '%%' ESCAPE '/'))"
+    ) in sql
+    assert (
+        "characters.id IN (SELECT character_classes.character_id FROM character_classes "
+        "WHERE (character_classes.subclass ILIKE '%%' || 'fiend' || '%%' ESCAPE '/'))"
+    ) in sql
+    assert (
+        "characters.id IN (SELECT character_feats.character_id FROM character_feats "
+        "WHERE (character_feats.feat ILIKE '%%' || 'alert' || '%%' ESCAPE '/'))"
+    ) in sql
+    assert "CAST(characters.invocations AS VARCHAR) ILIKE '%%' || 'blast' || '%%'" in sql
+    assert "characters.user_id IN (SELECT users.id FROM users WHERE (users.nickname ILIKE" in sql
+    assert "characters.level > 5" in sql
+    assert "CAST((characters.stats ->> 'STR') AS INTEGER) >= 12" in sql
@@ -0,0 +1,311 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from models import Character
+from utils.functions import STAT_NAMES
+from utils.normalize import normalize_race
+from utils.roster import ACTIVE_DAYS, is_active
+from utils.rostercache import roster_cache
+
+# The first level of tiers 2, 3 and 4
+TIER_BOUNDS = (5, 11, 17)
+LEVEL_PERCENTILES = (25, 50, 75, 90)
+
+
+@dataclass(frozen=True, slots=True)
+class RosterSummary:
+    """
+    The figures behind ``/nlp_stats`` and ``/nlp_subclasses``. Dicts of counts are ordered from most to least common,
+    unless noted otherwise.
+
+    Attributes:
+        total (int): The number of active characters.
+        races (dict[str, int]): Characters per normalized race.
+        levels (dict[int, int]): Characters per total level, highest level first.
+        level_mean (float): The average total level.
+        level_percentiles (dict[int, float]): The total level at each of ``LEVEL_PERCENTILES``.
+        tiers (dict[int, tuple[int, float]]): The number of characters and their average level, for each tier.
+        stat_means (dict[str, float]): The average of each stat, with missing stats counting as 0.
+        stat_medians (dict[str, float]): The median of each stat, of the characters that have it.
+        stat_min (dict[str, tuple[int, int]]): The lowest score of each stat, and the number of characters with it.
+        stat_max (dict[str, tuple[int, int]]): The highest score of each stat, and the number of characters with it.
+        classes (dict[str, int]): Characters per class.
+        class_means (dict[str, float]): The average level in each class, highest first.
+        class_max (dict[str, int]): The highest level in each class, highest first.
+        mono_classes (int): The number of single class characters.
+        most_multiclass (int): The most classes any one character has.
+        subclasses (dict[str, dict[str, int]]): Characters per subclass, for each class. Classes with the most
+            distinct subclasses come first.
+    """
+
+    total: int
+    races: dict[str, int]
+    levels: dict[int, int]
+    level_mean: float
+    level_percentiles: dict[int, float]
+    tiers: dict[int, tuple[int, float]]
+    stat_means: dict[str, float]
+    stat_medians: dict[str, float]
+    stat_min: dict[str, tuple[int, int]]
+    stat_max: dict[str, tuple[int, int]]
+    classes: dict[str, int]
+    class_means: dict[str, float]
+    class_max: dict[str, int]
+    mono_classes: int
+    most_multiclass: int
+    subclasses: dict[str, dict[str, int]]
+
+
+def _by_count(names: list[str], counts) -> dict[str, int]:
+    """*names* with a nonzero count, most common first, ties kept in order."""
+    order = np.argsort(-counts, kind="stable")
+    return {names[i]: int(counts[i]) for i in order if counts[i]}
+
+
+def _resized(array: np.ndarray, rows: int, columns: int = None, fill=0) -> np.ndarray:
+    shape = (rows,) if array.ndim == 1 else (rows, columns if columns is not None else array.shape[1])
+    out = np.full(shape, fill, dtype=array.dtype)
+    out[tuple(slice(0, n) for n in array.shape)] = array
+    return out
+
+
+class _Codes:
+    """Maps names to small integer codes, so they can be stored in arrays."""
+
+    def __init__(self):
+        self.names: list[str] = []
+        self._codes: dict[str, int] = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def code(self, name: str) -> int:
+        if name not in self._codes:
+            self._codes[name] = len(self.names)
+            self.names.append(name)
+        return self._codes[name]
+
+
+class RosterAggregates:
+    """
+    The active roster (see ``roster_filter``) as columns of NumPy arrays, one row per character, from which
+    ``RosterSummary`` is computed with vectorized operations rather than walking every character.
+
+    It follows ``roster_cache``: a written character has its row rewritten in place, and the arrays are rebuilt
+    whenever the roster is reloaded. Rows freed by removed characters are reused. Characters drop out as their
+    player's last activity leaves the window. The summary is memoized until the next change.
+
+    Races, classes and subclasses are stored as codes, see ``race_names``, ``class_names`` and ``subclass_names``.
+    Classes are the columns of ``class_levels`` (0 if the character doesn't have it) and ``subclasses`` (-1 if the
+    character has no subclass for it).
+    """
+
+    def __init__(self, capacity: int = 256):
+        self.reset(capacity)
+
+    def reset(self, capacity: int = 256):
+        self._slots: dict[int, int] = {}
+        self._free: list[int] = []
+        self._size = 0  # Rows ever used, the rest of the arrays is spare capacity
+        self._summary: RosterSummary | None = None
+
+        self._races = _Codes()
+        self._classes = _Codes()
+        self._subclasses = _Codes()
+
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.live = np.zeros(capacity, dtype=bool)
+        self.last_active = np.zeros(capacity, dtype=np.float64)
+        self.levels = np.zeros(capacity, dtype=np.int16)
+        self.races = np.zeros(capacity, dtype=np.int32)
+        self.stats = np.zeros((capacity, len(STAT_NAMES)), dtype=np.int16)
+        self.has_stats = np.zeros((capacity, len(STAT_NAMES)), dtype=bool)
+        self.class_levels = np.zeros((capacity, 0), dtype=np.int16)
+        self.subclasses = np.full((capacity, 0), -1, dtype=np.int32)
+
+    @property
+    def race_names(self) -> list[str]:
+        return self._races.names
+
+    @property
+    def class_names(self) -> list[str]:
+        return self._classes.names
+
+    @property
+    def subclass_names(self) -> list[str]:
+        return self._subclasses.names
+
+    def _grow(self):
+        rows = len(self.live) * 2
+        for name in ("ids", "live", "last_active", "levels", "races", "stats", "has_stats", "class_levels"):
+            setattr(self, name, _resized(getattr(self, name), rows))
+        self.subclasses = _resized(self.subclasses, rows, fill=-1)
+
+    def _class_column(self, clas: str) -> int:
+        column = self._classes.code(clas)
+        if column >= self.class_levels.shape[1]:
+            rows = len(self.live)
+            self.class_levels = _resized(self.class_levels, rows, column + 1)
+            self.subclasses = _resized(self.subclasses, rows, column + 1, fill=-1)
+        return column
+
+    def add(self, character: Character):
+        """Adds *character*, an active character with its user loaded, replacing it if it was already counted."""
+        self.discard(character.id)
+        if self._free:
+            slot = self._free.pop()
+        else:
+            if self._size == len(self.live):
+                self._grow()
+            slot = self._size
+            self._size += 1
+        self._slots[character.id] = slot
+
+        self.ids[slot] = character.id
+        self.live[slot] = True
+        self.last_active[slot] = character.user.lastActive.timestamp()
+        self.levels[slot] = character.level
+        self.races[slot] = self._races.code(normalize_race(character.race))
+        self.stats[slot] = 0
+        self.has_stats[slot] = False
+        for i, stat in enumerate(STAT_NAMES):
+            if stat in character.stats:
+                self.stats[slot, i] = character.stats[stat]
+                self.has_stats[slot, i] = True
+
+        self.class_levels[slot] = 0
+        self.subclasses[slot] = -1
+        # Placeholder characters are created with empty lists rather than dicts. Columns are looked up before
+        # indexing, as a new class replaces the arrays with wider ones.
+        for clas, level in (character.classes or {}).items():
+            column = self._class_column(clas)
+            self.class_levels[slot, column] = level
+        for clas, sub in (character.subclasses or {}).items():
+            column = self._class_column(clas)
+            self.subclasses[slot, column] = self._subclasses.code(sub)
+        self._summary = None
+
+    def discard(self, char_id: int):
+        if (slot := self._slots.pop(char_id, None)) is not None:
+            self.live[slot] = False
+            self._free.append(slot)
+            self._summary = None
+
+    def expire(self):
+        """Drops the characters whose player was last active before the window."""
+        cutoff = (datetime.now() - timedelta(days=ACTIVE_DAYS)).timestamp()
+        expired = self.live[: self._size] & (self.last_active[: self._size] < cutoff)
+        for slot in np.flatnonzero(expired):
+            self.discard(int(self.ids[slot]))
+
+    def roster_reset(self, characters: list[Character]):
+        self.reset(max(256, len(characters)))
+        for character in characters:
+            if is_active(character):
+                self.add(character)
+
+    def roster_updated(self, char_ids: list[int], characters: list[Character]):
+        for char_id in char_ids:
+            self.discard(char_id)
+        for character in characters:
+            if is_active(character):
+                self.add(character)
+
+    async def ensure(self):
+        """Makes sure the roster, and so the aggregates, are loaded, and expires characters that have gone inactive."""
+        await roster_cache.load()
+        self.expire()
+
+    def summary(self) -> RosterSummary:
+        if self._summary is None:
+            self._summary = self._summarize()
+        return self._summary
+
+    def _summarize(self) -> RosterSummary:
+        rows = np.flatnonzero(self.live[: self._size])
+        total = len(rows)
+        levels = self.levels[rows].astype(np.int64)
+        stats = self.stats[rows].astype(np.int64)
+        has_stats = self.has_stats[rows]
+        class_levels = self.class_levels[rows].astype(np.int64)
+        subclasses = self.subclasses[rows]
+
+        level_values, level_counts = np.unique(levels, return_counts=True)
+        tier_index = np.searchsorted(TIER_BOUNDS, levels, side="right")
+        tier_counts = np.bincount(tier_index, minlength=len(TIER_BOUNDS) + 1)
+        tier_sums = np.bincount(tier_index, weights=levels, minlength=len(TIER_BOUNDS) + 1)
+
+        stat_means = {}
+        stat_medians = {}
+        stat_min = {}
+        stat_max = {}
+        for i, stat in enumerate(STAT_NAMES):
+            stat_means[stat] = round(float(stats[:, i].sum(where=has_stats[:, i])) / total, 2) if total else 0.0
+            values = stats[has_stats[:, i], i]
+            if not len(values):
+                continue
+            stat_medians[stat] = float(np.median(values))
+            low, high = int(values.min()), int(values.max())
+            stat_min[stat] = (low, int(np.count_nonzero(values == low)))
+            stat_max[stat] = (high, int(np.count_nonzero(values == high)))
+
+        has_class = class_levels > 0
+        class_counts = has_class.sum(axis=0)
+        class_sums = class_levels.sum(axis=0)
+        class_max = class_levels.max(axis=0, initial=0)
+        in_roster = np.flatnonzero(class_counts)
+        classes_per_character = has_class.sum(axis=1)
+
+        subclass_breakdown = {}
+        for column in in_roster:
+            codes = subclasses[:, column]
+            codes, counts = np.unique(codes[codes >= 0], return_counts=True)
+            if len(codes):
+                order = np.argsort(-counts, kind="stable")
+                subclass_breakdown[self.class_names[column]] = {
+                    self.subclass_names[codes[i]]: int(counts[i]) for i in order
+                }
+
+        return RosterSummary(
+            total=total,
+            races=_by_count(self.race_names, np.bincount(self.races[rows], minlength=len(self._races))),
+            levels={int(level): int(count) for level, count in zip(level_values[::-1], level_counts[::-1])},
+            level_mean=round(float(levels.mean()), 2) if total else 0.0,
+            level_percentiles=(
+                dict(zip(LEVEL_PERCENTILES, np.percentile(levels, LEVEL_PERCENTILES).round(2).tolist()))
+                if total
+                else {}
+            ),
+            tiers={
+                tier + 1: (int(count), round(float(tier_sums[tier] / count), 2) if count else 0)
+                for tier, count in enumerate(tier_counts)
+            },
+            stat_means=stat_means,
+            stat_medians=stat_medians,
+            stat_min=stat_min,
+            stat_max=stat_max,
+            classes=_by_count(self.class_names, class_counts),
+            class_means=dict(
+                sorted(
+                    ((self.class_names[c], round(float(class_sums[c] / class_counts[c]), 2)) for c in in_roster),
+                    key=lambda x: x[1],
+                    reverse=True,
+                )
+            ),
+            class_max=dict(
+                sorted(
+                    ((self.class_names[c], int(class_max[c])) for c in in_roster),
+                    key=lambda x: x[1],
+                    reverse=True,
+                )
+            ),
+            mono_classes=int(np.count_nonzero(classes_per_character == 1)),
+            most_multiclass=int(classes_per_character.max(initial=0)),
+            subclasses=dict(sorted(subclass_breakdown.items(), key=lambda x: len(x[1]), reverse=True)),
+        )
+
+
+aggregate_store = RosterAggregates()
+roster_cache.subscribe(aggregate_store)
@@ -7,7 +7,7 @@ from .models import Gvar, Signature
 class AvraeClient(BaseClient):
     SERVICE_BASE = "https://api.avrae.io"
 
-    def __init__(self, http: aiohttp.ClientSession, api_key: str):
+    def __init__(self, api_key: str, http: aiohttp.ClientSession = None):
         super().__init__(http)
         self.api_key = api_key
 
@@ -0,0 +1,50 @@
+from sqlalchemy import update
+
+import db
+from utils.constants import REFRESH_BATCH_SIZE
+
+
+class WriteBehindBatcher:
+    """
+    Collects updates to rows of *model*, keyed by primary key, and writes them in short transactions of
+    *batch_size* rows, so a long running job neither holds a write transaction open throughout nor loses all of its
+    progress if it fails partway.
+
+    If given, ``await on_flush(session, rows)`` is called after each batch is written, in the same transaction, to
+    keep dependent tables in step with it. ``await on_commit(rows)`` is called once the batch has been committed.
+
+    Use as an async context manager to flush whatever is left over on exit.
+    """
+
+    def __init__(self, model, batch_size: int = REFRESH_BATCH_SIZE, on_flush=None, on_commit=None):
+        self.model = model
+        self.batch_size = batch_size
+        self.on_flush = on_flush
+        self.on_commit = on_commit
+        self._pending: dict[int, dict] = {}
+
+    async def add(self, row: dict):
+        """Queues *row*, a dict of column values including the primary key ``id``, flushing if the batch is full."""
+        # Later updates to the same row are merged into the one still waiting
+        self._pending[row["id"]] = {**self._pending.get(row["id"], {}), **row}
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+        rows = list(self._pending.values())
+        self._pending.clear()
+        async with db.async_session() as session:
+            await session.execute(update(self.model), rows)
+            if self.on_flush is not None:
+                await self.on_flush(session, rows)
+            await session.commit()
+        if self.on_commit is not None:
+            await self.on_commit(rows)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        await self.flush()
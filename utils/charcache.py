@@ -0,0 +1,46 @@
+from cachetools import TTLCache
+
+from utils.constants import CHARACTER_CACHE_SIZE, CHARACTER_CACHE_TTL
+
+
+class CharacterCache:
+    """
+    A bounded cache of slimmed DDB character payloads, keyed by character id. Entries expire after *ttl* seconds, and
+    the least recently used entry is evicted once *maxsize* is reached.
+    """
+
+    def __init__(self, maxsize: int = CHARACTER_CACHE_SIZE, ttl: float = CHARACTER_CACHE_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, char_id: str) -> dict | None:
+        data = self._cache.get(char_id)
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    def set(self, char_id: str, data: dict):
+        self._cache[char_id] = data
+
+    def invalidate(self, char_id: str = None):
+        """Removes *char_id* from the cache, or clears the whole cache if no id is given."""
+        if char_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(char_id, None)
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": self._cache.currsize,
+            "maxsize": self._cache.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+character_cache = CharacterCache()
@@ -0,0 +1,76 @@
+import operator
+import re
+
+from sqlalchemy import false, func, or_, select
+
+from models import Character
+from utils.fulltext import text_condition
+from utils.functions import STAT_NAMES
+from utils.roster import roster_filter
+
+COMPARISON_RE = re.compile(r"^(>=|<=|>|<|=)?\s*(-?\d+)$")
+OPERATORS = {
+    ">=": operator.ge,
+    "<=": operator.le,
+    ">": operator.gt,
+    "<": operator.lt,
+    "=": operator.eq,
+    None: operator.eq,
+}
+
+
+def parse_comparison(term: str):
+    """Parses a term like ``15`` or ``>=12`` into ``(operator, value)``, or None if it isn't one."""
+    match = COMPARISON_RE.match(term.strip())
+    if not match:
+        return None
+    op, value = match.groups()
+    return OPERATORS[op], int(value)
+
+
+def comparison_condition(expr, terms: list[str]):
+    """A condition for *expr* satisfying any of the comparison *terms*. Terms that don't parse match nothing."""
+    comparisons = [comparison for term in terms if (comparison := parse_comparison(term))]
+    if not comparisons:
+        return false()
+    return or_(*(op(expr, value) for op, value in comparisons))
+
+
+def stat_condition(terms: list[tuple[str, str]]):
+    """A condition for any of the ``(stat, comparison)`` *terms*, compared against the stats JSON."""
+    conditions = []
+    for stat, term in terms:
+        if stat not in STAT_NAMES or not (comparison := parse_comparison(term)):
+            continue
+        op, value = comparison
+        conditions.append(op(Character.stats[stat].as_integer(), value))
+    if not conditions:
+        return false()
+    return or_(*conditions)
+
+
+def compile_search(
+    text_filters: dict[str, list[str]] = None,
+    levels: list[str] = None,
+    stats: list[tuple[str, str]] = None,
+    active_only: bool = True,
+):
+    """
+    Compiles the filters of ``/nlp_search`` into one query for the matching characters. *text_filters* are matched
+    by ``text_condition``, each group of filters must match, and within a group any term may.
+    """
+    stmt = roster_filter(select(Character), active_only)
+    if text_filters:
+        stmt = stmt.where(text_condition(text_filters))
+    if levels:
+        stmt = stmt.where(comparison_condition(Character.level, levels))
+    if stats:
+        stmt = stmt.where(stat_condition(stats))
+    return stmt
+
+
+async def search_characters(session, stmt, limit: int = 20) -> tuple[list[Character], int]:
+    """Runs a query from ``compile_search``, returning the first *limit* characters and the total number matched."""
+    total = await session.scalar(select(func.count()).select_from(stmt.subquery()))
+    characters = (await session.scalars(stmt.order_by(Character.id).limit(limit))).all()
+    return characters, total
@@ -0,0 +1,28 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Iterable, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+async def bounded_map(
+    func: Callable[[T], Awaitable[R]], items: Iterable[T], limit: int
+) -> AsyncIterator[tuple[T, R]]:
+    """
+    Runs *func* over *items* with at most *limit* calls in flight, yielding ``(item, result)`` pairs in the order
+    they complete. Any calls still pending are cancelled when the generator is closed, so a consumer that may stop
+    early should iterate it inside ``contextlib.aclosing`` rather than leave that to garbage collection.
+    """
+    semaphore = asyncio.Semaphore(max(limit, 1))
+
+    async def worker(item: T) -> tuple[T, R]:
+        async with semaphore:
+            return item, await func(item)
+
+    tasks = [asyncio.create_task(worker(item)) for item in items]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
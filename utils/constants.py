@@ -8,6 +8,13 @@ AVRAE_TOKEN = os.getenv("AVRAE_TOKEN")
 
 GUILD_IDS = [1031055347319832666]  # NLP server
 DB_URI = os.getenv("DB_URI", f"sqlite+aiosqlite:///data/nlp.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_BATCH_SIZE = int(os.getenv("DB_BATCH_SIZE", 500))  # Rows per bulk INSERT
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))  # Seconds to wait for a free connection
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", 32768))  # KiB of page cache, per connection
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))  # Bytes
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000))  # Milliseconds to wait on a locked database
 MAGIC_ITEM_SHEET_ID = "170QfzpDrxE9vHDtjzvb1GmZ1L-dCXnm7qlZS9Vx7hdE"
 
 SUBCLASS_REPLACEMENTS = [
@@ -26,4 +33,47 @@ SUBCLASS_REPLACEMENTS = [
     "School of ",      # Wizard
     "Order of the",    # Bloodhunter
     r" \(.+?\)",       # 2014 Subclasses on 2024 Classes add the book tag. We don't care.
-]
\ No newline at end of file
+]
+
+# Feats that every character gets, matched from the start of the feat name
+IGNORED_FEATS = [
+    "Ability Score Improvement",
+    r".+ Ability Score Improvements",
+    "Weapon Mastery",
+    "Dark Bargain",
+]
+
+# Races containing the key are grouped under the value. Checked in order, so Half-Elf must come before Elf
+RACE_STANDARDIZATION = {
+    "Half-Elf": "Half-Elf",
+    "Elf": "Elf",
+    "Dwarf": "Dwarf",
+    "Tiefling": "Tiefling",
+    "Genasi": "Genasi",
+    "Human": "Human",
+    "Dragonborn": "Dragonborn",
+}
+
+NORMALIZE_CACHE_SIZE = int(os.getenv("NORMALIZE_CACHE_SIZE", 4096))  # Memoized names, per kind
+# Shared HTTP connection pool
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", 100))  # Total open connections
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", 20))
+HTTP_KEEPALIVE = float(os.getenv("HTTP_KEEPALIVE", 60))  # Seconds an idle connection is kept open
+HTTP_DNS_TTL = int(os.getenv("HTTP_DNS_TTL", 300))  # Seconds DNS lookups are cached
+
+# Character refresh tuning
+REFRESH_WORKERS = int(os.getenv("REFRESH_WORKERS", 8))  # Concurrent DDB fetches during a refresh
+REFRESH_BATCH_SIZE = int(os.getenv("REFRESH_BATCH_SIZE", 25))  # Refreshed characters written per transaction
+DDB_RATE_LIMIT = float(os.getenv("DDB_RATE_LIMIT", 4))  # Requests per second, per DDB host
+DDB_RATE_BURST = int(os.getenv("DDB_RATE_BURST", 4))
+DDB_CONCURRENCY = int(os.getenv("DDB_CONCURRENCY", 4))  # Requests in flight per DDB host, across all callers
+DDB_TIMEOUT = float(os.getenv("DDB_TIMEOUT", 15))  # Seconds per character lookup, retries included
+DDB_INTERACTIVE_TIMEOUT = float(os.getenv("DDB_INTERACTIVE_TIMEOUT", 5))  # The same, when someone is waiting on it
+
+# Private/deleted characters are re-checked after this wait, doubling with each consecutive failure
+NEGATIVE_CACHE_BASE_HOURS = float(os.getenv("NEGATIVE_CACHE_BASE_HOURS", 24))
+NEGATIVE_CACHE_MAX_DAYS = float(os.getenv("NEGATIVE_CACHE_MAX_DAYS", 30))
+
+# Character payload cache
+CHARACTER_CACHE_SIZE = int(os.getenv("CHARACTER_CACHE_SIZE", 512))
+CHARACTER_CACHE_TTL = float(os.getenv("CHARACTER_CACHE_TTL", 300))  # Seconds
@@ -1,14 +1,45 @@
+import asyncio
+
 import aiohttp
 
+from utils.constants import DDB_CONCURRENCY, DDB_INTERACTIVE_TIMEOUT, DDB_RATE_BURST, DDB_RATE_LIMIT, DDB_TIMEOUT
+from utils.ddbmodels import AvraeStats, DDBCharacterResponse
 from utils.httpclient import BaseClient, HTTPStatusException
+from utils.negcache import negative_cache
+from utils.scheduler import Priority
+
+AVRAE_SERVICE_BASE = "https://character-service-scds.dndbeyond.com/v1/avrae/"
+
+UNKNOWN_ERROR = "Unknown error occurred. Please try again later."
+ERROR_MESSAGES = {
+    404: "Character was not found. Potentially deactivated, or deleted.",
+    403: "Character is unavailable. Potentially due to being marked as private.",
+}
 
 
 class DDBClient(BaseClient):
     SERVICE_BASE = "https://character-service.dndbeyond.com/character/v5/character/"
+    RATE_LIMITS = {
+        "character-service.dndbeyond.com": (DDB_RATE_LIMIT, DDB_RATE_BURST),
+        "character-service-scds.dndbeyond.com": (DDB_RATE_LIMIT, DDB_RATE_BURST),
+    }
+    CONCURRENCY_LIMITS = {
+        "character-service.dndbeyond.com": DDB_CONCURRENCY,
+        "character-service-scds.dndbeyond.com": DDB_CONCURRENCY,
+    }
+    ROUTE_TIMEOUTS = {
+        SERVICE_BASE: DDB_TIMEOUT,
+        AVRAE_SERVICE_BASE: DDB_TIMEOUT,
+    }
+    # Seconds an interactive character lookup may take, queueing and retries included, unless given a ``timeout``
+    INTERACTIVE_TIMEOUT: float = DDB_INTERACTIVE_TIMEOUT
+    HEDGE = True
 
-    def __init__(self, http: aiohttp.ClientSession, api_key: str):
+    def __init__(self, api_key: str, http: aiohttp.ClientSession = None):
         super().__init__(http)
         self.api_key = api_key
+        # (char_id, slim, priority) -> the fetch currently running for it, shared by every concurrent caller
+        self._in_flight: dict[tuple[str, bool, Priority], asyncio.Task] = {}
 
     async def request(self, method: str, route: str, headers=None, **kwargs):
         if headers is None:
@@ -19,37 +50,66 @@ class DDBClient(BaseClient):
             kwargs.pop("noauth")
         return await super().request(method, route, headers=headers, **kwargs)
 
-    async def get_character(self, char_id: str):
-        try:
-            char = await self.get(char_id)
-            char = char["data"]
-        except HTTPStatusException as e:
-            self.logger.debug(e)
-            error_message = "Unknown error occurred. Please try again later."
-            if e.status_code == 404:
-                error_message = (
-                    "Character was not found. Potentially deactivated, or deleted."
-                )
-            elif e.status_code == 403:
-                error_message = "Character is unavailable. Potentially due to being marked as private."
-            return None, error_message
-
-        try:
-            avr_api = await self.get(
-                char_id,
-                service_base="https://character-service-scds.dndbeyond.com/v1/avrae/",
-                noauth=True,
-            )
-            char["avrae"] = avr_api
-        except HTTPStatusException as e:
-            self.logger.debug(e)
-            error_message = "Unknown error occurred. Please try again later."
-            if e.status_code == 404:
-                error_message = (
-                    "Character was not found. Potentially deactivated, or deleted."
-                )
-            elif e.status_code == 403:
-                error_message = "Character is unavailable. Potentially due to being marked as private."
-            return None, error_message
+    async def get_character(self, char_id: str, slim: bool = False, **kwargs):
+        """
+        Gets the character data for *char_id*, returning a tuple of ``(data, error_message)``. Transient upstream
+        failures, which the character itself isn't to blame for, are raised as ``HTTPException`` instead.
+
+        If *slim* is set, the responses are parsed into the projections in ``utils.ddbmodels``, and the data only
+        contains the fields they declare.
+
+        Characters that were recently private or deleted aren't refetched by ``Priority.BATCH`` calls until their
+        re-check is due, see ``NegativeCache``. Interactive calls always go upstream, as the player may have just fixed
+        their sheet. Concurrent calls for the same character, with the same *slim* and ``priority``, share a single
+        upstream fetch, and all receive its result or error. An interactive call never waits on a batch fetch. Any other
+        *kwargs*, such as ``timeout`` or ``hedge``, are passed on to the requests of whichever call started it.
+        Interactive calls are held to ``INTERACTIVE_TIMEOUT`` unless given a ``timeout``.
+        """
+        priority = kwargs.get("priority", Priority.INTERACTIVE)
+        if priority == Priority.INTERACTIVE:
+            kwargs.setdefault("timeout", self.INTERACTIVE_TIMEOUT)
+        key = (char_id, slim, priority)
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._get_character(char_id, slim, **kwargs))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shielded, so one caller being cancelled doesn't cancel the fetch for everyone else
+        return await asyncio.shield(task)
+
+    async def _get_character(self, char_id: str, slim: bool, **kwargs):
+        batch = kwargs.get("priority", Priority.INTERACTIVE) == Priority.BATCH
+        if batch and (unavailable := await negative_cache.get(int(char_id))):
+            self.logger.debug(f"Skipping character {char_id}, unavailable until {unavailable.nextCheck}")
+            return None, ERROR_MESSAGES[unavailable.status_code]
+
+        char_kwargs, avrae_kwargs = kwargs, kwargs
+        if slim:
+            char_kwargs = {**kwargs, "response_model": DDBCharacterResponse}
+            avrae_kwargs = {**kwargs, "response_model": AvraeStats}
+
+        # The sheet and its Avrae stats are independent, so fetch them both at once
+        results = await asyncio.gather(
+            self.get(char_id, **char_kwargs),
+            self.get(char_id, service_base=AVRAE_SERVICE_BASE, noauth=True, **avrae_kwargs),
+            return_exceptions=True,
+        )
+        for result in results:
+            if not isinstance(result, BaseException):
+                continue
+            if isinstance(result, HTTPStatusException) and not result.transient:
+                self.logger.debug(result)
+                if result.status_code in ERROR_MESSAGES:
+                    await negative_cache.record(int(char_id), result.status_code)
+                return None, ERROR_MESSAGES.get(result.status_code, UNKNOWN_ERROR)
+            raise result
 
+        await negative_cache.clear(int(char_id))
+        char, avr_api = results
+        if slim:
+            # exclude_unset keeps the shape of the raw payload, a key missing from DDB is still missing here
+            char = char.model_dump(exclude_unset=True)
+            avr_api = avr_api.model_dump(exclude_unset=True)
+        char = char["data"]
+        char["avrae"] = avr_api
         return char, None
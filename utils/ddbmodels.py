@@ -0,0 +1,68 @@
+from pydantic import BaseModel
+
+# Slim projections of the DDB character payloads. Only the fields read by the helpers in utils.functions are
+# declared, so validating the raw response bytes into these skips building the rest of the (very large) payload.
+
+
+class Definition(BaseModel):
+    name: str
+
+
+class DDBRace(BaseModel):
+    fullName: str
+
+
+class DDBClass(BaseModel):
+    level: int
+    definition: Definition
+    subclassDefinition: Definition | None = None
+
+
+class DDBFeat(BaseModel):
+    definition: Definition
+
+
+class DDBOption(BaseModel):
+    componentId: int | None = None
+    componentTypeId: int | None = None
+    definition: Definition
+
+
+class DDBModifier(BaseModel):
+    entityTypeId: int | None = None
+    type: str | None = None
+    friendlySubtypeName: str | None = None
+
+
+class ItemDefinition(BaseModel):
+    name: str
+    magic: bool | None = None
+    canEquip: bool | None = None
+    isConsumable: bool | None = None
+
+
+class DDBItem(BaseModel):
+    quantity: int
+    definition: ItemDefinition
+
+
+class DDBCharacter(BaseModel):
+    name: str | None = None
+    race: DDBRace | None = None
+    classes: list[DDBClass] | None = None
+    feats: list[DDBFeat] | None = None
+    options: dict[str, list[DDBOption] | None] | None = None
+    modifiers: dict[str, list[DDBModifier] | None] | None = None
+    inventory: list[DDBItem] | None = None
+
+
+class DDBCharacterResponse(BaseModel):
+    data: DDBCharacter
+
+
+class AbilityScore(BaseModel):
+    score: int
+
+
+class AvraeStats(BaseModel):
+    stats: dict[str, AbilityScore]
@@ -0,0 +1,83 @@
+from sqlalchemy import Integer, String, and_, cast, column, or_, select, text
+
+import db
+from models import Character, CharacterClass, CharacterFeat, User
+
+SEARCH_COLUMNS = ("name", "race", "player", "classes", "subclasses", "feats", "invocations")
+# The trigram tokenizer can't MATCH anything shorter than a trigram, those terms fall back to LIKE
+TRIGRAM_LENGTH = 3
+
+
+def _phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _like(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def uses_fts() -> bool:
+    """
+    Whether ``text_condition`` searches the characters_fts index, which only exists on SQLite. Elsewhere it searches
+    character_classes and character_feats, so only there do they need keeping in step with the characters.
+    """
+    return db.engine.dialect.name == "sqlite"
+
+
+def text_condition(filters: dict[str, list[str]]):
+    """
+    A condition on ``Character`` for each column in *filters* containing any of its terms, ignoring case. The
+    columns are those of ``SEARCH_COLUMNS``.
+
+    On SQLite this is a single lookup in the characters_fts trigram index. Elsewhere the index doesn't exist, so the
+    underlying tables are searched directly.
+    """
+    for field in filters:
+        if field not in SEARCH_COLUMNS:
+            raise ValueError(f"Unknown search column: {field}")
+    if not uses_fts():
+        return _table_condition(filters)
+
+    groups = []
+    likes = []
+    params = {}
+    for field, terms in filters.items():
+        if all(len(term) >= TRIGRAM_LENGTH for term in terms):
+            groups.append("(" + " OR ".join(f"{field} : {_phrase(term)}" for term in terms) + ")")
+            continue
+        conditions = []
+        for term in terms:
+            key = f"fts_like_{len(params)}"
+            params[key] = _like(term)
+            conditions.append(f"{field} LIKE :{key} ESCAPE '\\'")
+        likes.append("(" + " OR ".join(conditions) + ")")
+
+    where = likes
+    if groups:
+        where = ["characters_fts MATCH :fts_query", *likes]
+        params["fts_query"] = " AND ".join(groups)
+    matches = text(f"SELECT rowid FROM characters_fts WHERE {' AND '.join(where)}").bindparams(**params)
+    return Character.id.in_(matches.columns(column("rowid", Integer)))
+
+
+def _table_condition(filters: dict[str, list[str]]):
+    def contains(attr, terms):
+        return or_(*(attr.icontains(term, autoescape=True) for term in terms))
+
+    def has_child(attr, terms):
+        return Character.id.in_(select(attr.table.c.character_id).where(contains(attr, terms)))
+
+    conditions = {
+        "name": lambda terms: contains(Character.name, terms),
+        "race": lambda terms: contains(Character.race, terms),
+        # A subquery, so the condition doesn't need users joined in
+        "player": lambda terms: Character.user_id.in_(
+            select(User.id).where(or_(contains(User.nickname, terms), contains(User.name, terms)))
+        ),
+        "classes": lambda terms: has_child(CharacterClass.class_name, terms),
+        "subclasses": lambda terms: has_child(CharacterClass.subclass, terms),
+        "feats": lambda terms: has_child(CharacterFeat.feat, terms),
+        "invocations": lambda terms: contains(cast(Character.invocations, String), terms),
+    }
+    return and_(*(conditions[field](terms) for field, terms in filters.items()))
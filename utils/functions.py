@@ -1,7 +1,14 @@
+import collections
+import hashlib
+import json
 import re
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping
 
 from models import Character
-from utils.constants import SUBCLASS_REPLACEMENTS
+from utils.charcache import character_cache
+from utils.normalize import normalize_feat, normalize_subclass
 
 
 def split_arg(arg):
@@ -24,8 +31,13 @@ def pluralize(word, count):
     return word + "s" if count != 1 else word
 
 
-async def get_character_data(bot, sheet_url: str):
-    """Gets the character data from the DDB API, given a character sheet URL."""
+async def get_character_data(bot, sheet_url: str, refresh: bool = False, **kwargs):
+    """Gets the character data from the DDB API, given a character sheet URL.
+
+    The data is parsed into the slim projection from ``utils.ddbmodels``, and successful lookups are cached. If
+    *refresh* is set, the cache is skipped and the fresh data replaces whatever was cached. Any *kwargs* are passed
+    on to the DDB requests.
+    """
     regex = r"^.*characters\/(\d+)\/?"
     match = re.search(regex, sheet_url)
 
@@ -33,167 +45,226 @@ async def get_character_data(bot, sheet_url: str):
         return None, "Unable to find a valid DDB character link."
 
     char_id = match.group(1)
-    json_data, error = await bot.ddb_client.get_character(char_id)
+    if not refresh and (json_data := character_cache.get(char_id)) is not None:
+        return json_data, None
 
-    return json_data, error
+    json_data, error = await bot.ddb_client.get_character(char_id, slim=True, **kwargs)
+    if error:
+        return json_data, error
 
+    character_cache.set(char_id, json_data)
+    return json_data, None
 
-def chunk_text(
-    text, max_chunk_size=1024, chunk_on=("\n\n", "\n", ". ", ", ", " "), chunker_i=0
-):
-    """
-    Recursively chunks *text* into a list of str, with each element no longer than *max_chunk_size*.
-    Prefers splitting on the elements of *chunk_on*, in order.
 
-    Stolen from Avrae's code, shamelessly
+def chunk_text(text, max_chunk_size=1024, chunk_on=("\n\n", "\n", ". ", ", ", " ")):
+    """
+    Chunks *text* into a list of str, with each element no longer than *max_chunk_size*.
+    Prefers splitting on the elements of *chunk_on*, in order. See ``iter_chunks``.
     """
+    return list(iter_chunks(text, max_chunk_size, chunk_on))
 
-    if len(text) <= max_chunk_size:  # the chunk is small enough
-        return [text]
-    if chunker_i >= len(chunk_on):  # we have no more preferred chunk_on characters
-        # optimization: instead of merging a thousand characters, just use list slicing
-        return [
-            text[:max_chunk_size],
-            *chunk_text(text[max_chunk_size:], max_chunk_size, chunk_on, chunker_i + 1),
-        ]
-
-    # split on the current character
-    chunks = []
-    split_char = chunk_on[chunker_i]
-    for chunk in text.split(split_char):
-        chunk = f"{chunk}{split_char}"
-        if len(chunk) > max_chunk_size:  # this chunk needs to be split more, recurse
-            chunks.extend(chunk_text(chunk, max_chunk_size, chunk_on, chunker_i + 1))
-        elif (
-            chunks and len(chunk) + len(chunks[-1]) <= max_chunk_size
-        ):  # this chunk can be merged
-            chunks[-1] += chunk
-        else:
-            chunks.append(chunk)
 
-    # if the last chunk is just the split_char, yeet it
-    if chunks[-1] == split_char:
-        chunks.pop()
+def iter_chunks(text, max_chunk_size=1024, chunk_on=("\n\n", "\n", ". ", ", ", " ")):
+    """
+    Lazily chunks *text*, yielding str no longer than *max_chunk_size*.
+    Prefers splitting on the elements of *chunk_on*, in order.
 
-    # remove extra split_char from last chunk
-    chunks[-1] = chunks[-1][: -len(split_char)]
-    return chunks
+    Originally stolen from Avrae's recursive chunker, shamelessly, and unrolled into an explicit stack. Each level
+    splits on its own separator, merging pieces into the open chunk while they fit, and hands pieces that are still
+    too long down to the next level. Once out of separators, text is sliced at *max_chunk_size*.
 
+    At the end of a level, only its last chunk or two are ever touched again (dropping a trailing lone separator,
+    then trimming the separator off the new last chunk), so only a few closed chunks per level are held back before
+    being yielded. Chunks are kept as lists of parts until yielded, so merging never re-copies a growing string.
+    """
+    if len(text) <= max_chunk_size:  # the chunk is small enough
+        yield text
+        return
+
+    # (parts, length) of each closed chunk not yet yielded, as the last few might still be reopened and trimmed
+    closed = collections.deque()
+    hold_back = len(chunk_on) + 2
+    # the open chunk, which the next piece may be merged into
+    parts, length = None, 0
+
+    def level(text_, chunker_i):
+        if chunker_i >= len(chunk_on):  # we have no more preferred chunk_on characters
+            pieces = (text_[i : i + max_chunk_size] for i in range(0, len(text_), max_chunk_size))
+        else:
+            pieces = iter(text_.split(chunk_on[chunker_i]))
+        # [chunker_i, pieces, number of chunks this level has produced]
+        return [chunker_i, pieces, 0]
+
+    stack = [level(text, 0)]
+    while stack:
+        frame = stack[-1]
+        chunker_i, pieces, count = frame
+        split_char = chunk_on[chunker_i] if chunker_i < len(chunk_on) else None
+        descend = None
+
+        # The per-piece work stays in these tight loops, only leaving them to descend into a piece that's too long
+        if split_char is None:  # slices always stand alone
+            for chunk in pieces:
+                if parts is not None:
+                    closed.append((parts, length))
+                    if len(closed) > hold_back:
+                        yield "".join(closed.popleft()[0])
+                parts, length = [chunk], len(chunk)
+                count += 1
+        else:
+            for chunk in pieces:
+                chunk = f"{chunk}{split_char}"
+                size = len(chunk)
+                if size > max_chunk_size:  # this chunk needs to be split more, descend
+                    descend = chunk
+                    break
+                if count and length + size <= max_chunk_size:  # this chunk can be merged
+                    parts.append(chunk)
+                    length += size
+                    continue
+                if parts is not None:
+                    closed.append((parts, length))
+                    if len(closed) > hold_back:
+                        yield "".join(closed.popleft()[0])
+                parts, length = [chunk], size
+                count += 1
+
+        if descend is not None:
+            frame[2] = count
+            stack.append(level(descend, chunker_i + 1))
+            continue
 
-def get_classes(data: dict) -> (dict[str, int], dict[str, str]):
+        # this level is done
+        stack.pop()
+        if split_char is not None:
+            # if the last chunk is just the split_char, yeet it
+            if length == len(split_char) and "".join(parts) == split_char:
+                parts, length = closed.pop()
+                count -= 1
+            # remove extra split_char from last chunk
+            last = "".join(parts)[: -len(split_char)]
+            parts, length = [last], len(last)
+        if stack:
+            stack[-1][2] += count
+
+    for closed_parts, _ in closed:
+        yield "".join(closed_parts)
+    yield "".join(parts)
+
+
+STAT_NAMES = ("STR", "DEX", "CON", "INT", "WIS", "CHA")
+BAG_NAMES = ("Backpack", "Equipment", "Magical Items", "Consumables", "Harvest")
+
+TOOL_ENTITY_TYPE_ID = 2103445194
+LANGUAGE_ENTITY_TYPE_ID = 906033267
+INVOCATION_COMPONENT = (10292364, 12168134)  # (componentId, componentTypeId)
+
+
+@dataclass(frozen=True, slots=True)
+class CharacterSnapshot:
+    """Everything we derive from a DDB character, extracted in a single pass by ``extract_character``."""
+
+    name: str
+    race: str
+    level: int
+    classes: Mapping[str, int]
+    subclasses: Mapping[str, str]
+    stats: Mapping[str, int]
+    invocations: tuple[str, ...]
+    feats: tuple[str, ...]
+    tools: tuple[str, ...]
+    expertise: tuple[str, ...]
+    languages: tuple[str, ...]
+    bags: tuple[tuple[str, Mapping[str, int]], ...]
+
+    def columns(self) -> dict:
+        """The snapshot as values for the matching ``Character`` columns."""
+        return {
+            "name": self.name,
+            "race": self.race,
+            "level": self.level,
+            "classes": dict(self.classes),
+            "subclasses": dict(self.subclasses),
+            "stats": dict(self.stats),
+            "invocations": list(self.invocations),
+            "feats": list(self.feats),
+        }
+
+    def fingerprint(self) -> str:
+        """A hash of ``columns()``, which only changes if the stored character would."""
+        canonical = json.dumps(self.columns(), sort_keys=True, separators=(",", ":"))
+        return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+def extract_character(data: dict) -> CharacterSnapshot:
+    """Walks the DDB character data once, collecting every field we use into a ``CharacterSnapshot``."""
     classes = {}
     subclasses = {}
-
-    for _class in data["classes"]:
+    for _class in data.get("classes") or ():
         cur_class = _class["definition"]["name"]
-        cur_level = _class["level"]
-        classes[cur_class] = cur_level
-        if _class["subclassDefinition"]:
-            sub_name = _class["subclassDefinition"]["name"]
-            sub_name = re.sub(rf"""{"|".join(SUBCLASS_REPLACEMENTS)}""", "", sub_name)
-            subclasses[cur_class] = sub_name
-
-    return classes, subclasses
-
+        classes[cur_class] = _class["level"]
+        if _class.get("subclassDefinition"):
+            subclasses[cur_class] = normalize_subclass(_class["subclassDefinition"]["name"])
 
-def get_tools(data: dict = None) -> (list[str], list[str]):
-    """Get the tool proficiencies from the DDB character data"""
-    profs = []
+    # Tools and languages both come from the modifiers, so collect them in the same walk
+    tools = []
     expertise = []
-    for _type in data.get("modifiers", {}):
-        for modifier in data["modifiers"][_type]:
-            # We only care about tool proficiencies
-            if modifier["entityTypeId"] == 2103445194:
-                if modifier["type"] == "proficiency":
-                    profs.append(modifier["friendlySubtypeName"])
-                if modifier["type"] == "expertise":
-                    expertise.append(modifier["friendlySubtypeName"])
-
-    return profs, expertise
-
-
-def get_languages(data: dict = None) -> list[str]:
-    """Get the languages from the DDB character data"""
     languages = []
-    for _type in data.get("modifiers", {}):
-        for modifier in data["modifiers"][_type]:
-            # We only care about languages
-            if modifier["entityTypeId"] == 906033267:
+    for modifiers in (data.get("modifiers") or {}).values():
+        for modifier in modifiers or ():
+            entity_type = modifier.get("entityTypeId")
+            if entity_type == TOOL_ENTITY_TYPE_ID:
+                modifier_type = modifier.get("type")
+                if modifier_type == "proficiency":
+                    tools.append(modifier["friendlySubtypeName"])
+                if modifier_type == "expertise":
+                    expertise.append(modifier["friendlySubtypeName"])
+            elif entity_type == LANGUAGE_ENTITY_TYPE_ID:
                 languages.append(modifier["friendlySubtypeName"])
 
-    return languages
-
-
-def get_invocations(data: dict = None) -> list[str]:
-    """Get the invocations from the DDB character data"""
     invocations = []
-    for _type in data["options"]:
-        if not data["options"][_type]:
-            continue
-        for option in data["options"][_type]:
-            if (
-                option["componentId"] == 10292364
-                and option["componentTypeId"] == 12168134
-            ):
+    for options in (data.get("options") or {}).values():
+        for option in options or ():
+            if (option.get("componentId"), option.get("componentTypeId")) == INVOCATION_COMPONENT:
                 invocations.append(option["definition"]["name"])
 
-    return invocations
-
-
-def get_feats(data: dict = None) -> list[str]:
-    """Get the feats from the DDB character data"""
     feats = []
-    for _feat in data["feats"]:
-        feat_name = _feat["definition"]["name"]
-        feat_name = re.sub(r"^\d+:", "", feat_name).strip()
-
+    for _feat in data.get("feats") or ():
         # Remove some basic things
-        if any(
-            re.match(x, feat_name)
-            for x in [
-                "Ability Score Improvement",
-                r".+ Ability Score Improvements",
-                "Weapon Mastery",
-                "Dark Bargain",
-            ]
-        ):
-            continue
-        feats.append(feat_name)
-
-    return feats
-
-
-def get_stats(data: dict = None) -> dict[str, int]:
-    stat_names = ["STR", "DEX", "CON", "INT", "WIS", "CHA"]
-    stats = {}
-    for stat in stat_names:
-        stats[stat] = data["avrae"]["stats"][stat.lower()]["score"]
-
-    return stats
-
+        if feat_name := normalize_feat(_feat["definition"]["name"]):
+            feats.append(feat_name)
 
-def get_bags(data: dict = None) -> list:
-    """Get the bags from the DDB character data"""
-    out = {
-        "Backpack": {},
-        "Equipment": {},
-        "Magical Items": {},
-        "Consumables": {},
-        "Harvest": {},
-    }
+    # Sheets that haven't been imported into Avrae, or are missing a race, still extract, with those fields left empty
+    avrae_stats = (data.get("avrae") or {}).get("stats") or {}
+    stats = {stat: avrae_stats[stat.lower()]["score"] for stat in STAT_NAMES if stat.lower() in avrae_stats}
 
-    for item in data["inventory"]:
+    bags = {bag_name: {} for bag_name in BAG_NAMES}
+    for item in data.get("inventory") or ():
+        definition = item["definition"]
         bag_name = "Backpack"
-        if item["definition"]["magic"]:
+        if definition.get("magic"):
             bag_name = "Magical Items"
-        elif item["definition"]["canEquip"]:
+        elif definition.get("canEquip"):
             bag_name = "Equipment"
-        elif item["definition"]["isConsumable"]:
+        elif definition.get("isConsumable"):
             bag_name = "Consumables"
-        item_name = item["definition"]["name"]
-        quantity = item["quantity"]
-        out[bag_name][item_name] = out[bag_name].get(item_name, 0) + quantity
-    return list(out.items())
+        item_name = definition["name"]
+        bags[bag_name][item_name] = bags[bag_name].get(item_name, 0) + item["quantity"]
+
+    return CharacterSnapshot(
+        name=data.get("name") or "",
+        race=(data.get("race") or {}).get("fullName") or "",
+        level=sum(classes.values()),
+        classes=MappingProxyType(classes),
+        subclasses=MappingProxyType(subclasses),
+        stats=MappingProxyType(stats),
+        invocations=tuple(invocations),
+        feats=tuple(feats),
+        tools=tuple(tools),
+        expertise=tuple(expertise),
+        languages=tuple(languages),
+        bags=tuple((bag_name, MappingProxyType(items)) for bag_name, items in bags.items()),
+    )
 
 
 def class_disp(character: Character) -> str:
@@ -0,0 +1,42 @@
+from utils.latency import LatencyTracker
+from utils.ratelimit import TokenBucket
+from utils.retry import CircuitBreaker
+from utils.scheduler import RequestScheduler
+
+
+class HostState:
+    """
+    Everything shared by the requests to a host, whichever client sends them: its circuit breaker, its latency, and
+    the schedulers and token buckets limiting it.
+
+    Schedulers and buckets are kept per configuration, so a client with different limits for the host gets its own
+    rather than silently sharing whichever was created first.
+    """
+
+    def __init__(self):
+        self.breaker = CircuitBreaker()
+        self.latency = LatencyTracker()
+        self._schedulers: dict[int, RequestScheduler] = {}
+        self._buckets: dict[tuple[float, int], TokenBucket] = {}
+
+    def scheduler(self, limit: int) -> RequestScheduler:
+        """Gets the request scheduler allowing *limit* requests in flight, creating it on first use."""
+        if limit not in self._schedulers:
+            self._schedulers[limit] = RequestScheduler(limit)
+        return self._schedulers[limit]
+
+    def bucket(self, rate: float, capacity: int = 1) -> TokenBucket:
+        """Gets the token bucket for *rate* and *capacity*, creating it on first use."""
+        if (rate, capacity) not in self._buckets:
+            self._buckets[rate, capacity] = TokenBucket(rate, capacity)
+        return self._buckets[rate, capacity]
+
+
+_hosts: dict[str, HostState] = {}
+
+
+def get_host(host: str) -> HostState:
+    """Gets the shared state for *host*, creating it on first use."""
+    if host not in _hosts:
+        _hosts[host] = HostState()
+    return _hosts[host]
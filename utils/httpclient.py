@@ -1,9 +1,17 @@
 import abc
+import asyncio
+import contextlib
 import logging
+from urllib.parse import urlsplit
 
 import aiohttp
+from pydantic import BaseModel
 
 from errors import WildException
+from utils.constants import HTTP_DNS_TTL, HTTP_KEEPALIVE, HTTP_POOL_LIMIT, HTTP_POOL_LIMIT_PER_HOST
+from utils.hosts import get_host
+from utils.retry import RetryPolicy
+from utils.scheduler import Priority
 
 
 class HTTPException(WildException):
@@ -14,42 +22,298 @@ class HTTPTimeout(HTTPException):
     pass
 
 
+class HTTPConnectionError(HTTPException):
+    pass
+
+
+class CircuitOpen(HTTPException):
+    pass
+
+
+class HTTPDecodeError(HTTPException):
+    """The host answered, but with a body that couldn't be parsed, or didn't fit the ``response_model``."""
+
+    pass
+
+
 class HTTPStatusException(HTTPException):
-    def __init__(self, status_code: int, msg: str):
+    def __init__(self, status_code: int, msg: str, retry_after: float = None):
         super().__init__(msg)
         self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def transient(self) -> bool:
+        """Whether the error is likely to go away on its own, i.e. the upstream is overloaded or down."""
+        return self.status_code == 429 or self.status_code >= 500
+
+
+class SessionPool:
+    """
+    A process-wide aiohttp session, shared by every client so that keep-alive connections (and their TLS sessions)
+    to each host are reused rather than each client handshaking from its own cold pool.
+
+    The session is created lazily, as aiohttp sessions must be created inside the running event loop.
+    """
+
+    def __init__(
+        self,
+        limit: int = HTTP_POOL_LIMIT,
+        limit_per_host: int = HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout: float = HTTP_KEEPALIVE,
+        ttl_dns_cache: int = HTTP_DNS_TTL,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+        self._session: aiohttp.ClientSession | None = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.ttl_dns_cache,
+                use_dns_cache=True,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+http_pool = SessionPool()
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parses a Retry-After header given in seconds. The HTTP-date form isn't used by our upstreams, so is ignored."""
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return None
 
 
 class BaseClient(abc.ABC):
     SERVICE_BASE: str = ...
+    # host -> (requests per second, burst size). Hosts not listed here are not throttled.
+    RATE_LIMITS: dict[str, tuple[float, int]] = {}
+    # host -> max requests in flight, queued by priority beyond that. Hosts not listed here are not scheduled.
+    CONCURRENCY_LIMITS: dict[str, int] = {}
+    RETRY_POLICY: RetryPolicy = RetryPolicy()
+    # Seconds a request may take in total, retries included. ROUTE_TIMEOUTS overrides this for URLs starting with
+    # the given prefix, and the ``timeout`` kwarg overrides both for a single call.
+    DEFAULT_TIMEOUT: float = 30
+    ROUTE_TIMEOUTS: dict[str, float] = {}
+    # Whether GETs are hedged by default: if no response arrives within HEDGE_PERCENTILE of the host's recent
+    # latency, a duplicate request is sent and whichever answers first wins. Overridden by the ``hedge`` kwarg.
+    HEDGE: bool = False
+    HEDGE_PERCENTILE: float = 0.95
     logger: logging.Logger = logging.getLogger(__name__)
 
-    def __init__(self, http: aiohttp.ClientSession):
-        self.http = http
+    def __init__(self, http: aiohttp.ClientSession = None):
+        """
+        :param http: A dedicated session for this client. If not given, the shared ``http_pool`` session is used.
+        """
+        self._http = http
+
+    @property
+    def http(self) -> aiohttp.ClientSession:
+        return self._http or http_pool.session
+
+    async def request(
+        self,
+        method: str,
+        route: str,
+        response_as_text=False,
+        timeout: float = None,
+        hedge: bool = None,
+        priority: Priority = Priority.INTERACTIVE,
+        **kwargs,
+    ):
+        """
+        Sends a request, retrying transient failures according to ``RETRY_POLICY`` until the deadline given by
+        *timeout* (see ``DEFAULT_TIMEOUT``) passes. Requests to a host whose circuit breaker is open fail immediately
+        with ``CircuitOpen``. If the host is in ``CONCURRENCY_LIMITS``, the request queues in the *priority* lane.
 
-    async def request(self, method: str, route: str, response_as_text=False, **kwargs):
+        If a pydantic ``response_model`` kwarg is given, the response body is validated into that model rather than
+        returned as parsed JSON.
+        """
         service_base = kwargs.get("service_base", self.SERVICE_BASE)
         if "service_base" in kwargs:
             kwargs.pop("service_base")
+        url = f"{service_base}{route}"
+        host = urlsplit(url).hostname
+        state = get_host(host)
+        breaker = state.breaker
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.route_timeout(url))
+        if hedge is None:
+            hedge = self.HEDGE
+        hedge_after = state.latency.percentile(self.HEDGE_PERCENTILE) if hedge and method.upper() == "GET" else None
+
+        attempt = 0
+        while True:
+            attempt += 1
+            if not breaker.allow():
+                raise CircuitOpen(
+                    f"{host} is currently unavailable. Please try again in a few minutes."
+                )
+
+            try:
+                if hedge_after is not None:
+                    data = await self._hedged(
+                        method, url, response_as_text, deadline, priority, hedge_after, **kwargs
+                    )
+                else:
+                    data = await self._send(method, url, response_as_text, deadline, priority, **kwargs)
+            except (HTTPTimeout, HTTPConnectionError) as e:
+                breaker.record_failure()
+                error, retry_after = e, None
+            except HTTPStatusException as e:
+                if not e.transient:
+                    breaker.record_success()  # The host is up, the request itself is the problem
+                    raise
+                breaker.record_failure()
+                error, retry_after = e, e.retry_after
+            except HTTPDecodeError:
+                # The host answered, so this says nothing about whether it's up, and retrying would parse the same body
+                breaker.release_trial()
+                raise
+            except BaseException:
+                # Cancelled, or a bug of ours, so a trial request never finished
+                breaker.release_trial()
+                raise
+            else:
+                breaker.record_success()
+                return data
+
+            delay = self.RETRY_POLICY.delay(method, attempt, retry_after)
+            if delay is None or loop.time() + delay >= deadline:
+                raise error
+            self.logger.info(
+                f"Retrying {method} {url} in {delay:.2f}s (attempt {attempt}): {error}"
+            )
+            await asyncio.sleep(delay)
+
+    def route_timeout(self, url: str) -> float:
+        """Gets the deadline for *url*, from the longest matching prefix in ``ROUTE_TIMEOUTS``."""
+        matches = [prefix for prefix in self.ROUTE_TIMEOUTS if url.startswith(prefix)]
+        if not matches:
+            return self.DEFAULT_TIMEOUT
+        return self.ROUTE_TIMEOUTS[max(matches, key=len)]
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        response_as_text: bool,
+        deadline: float,
+        priority: Priority,
+        sent: asyncio.Event = None,
+        **kwargs,
+    ):
+        """
+        Sends the request once it has a slot and a token for its host. The host's latency is measured from then on,
+        so time spent queued behind other requests isn't counted. *sent* is set as the request goes out.
+
+        Queueing counts towards the *deadline*, so a request stuck behind others still fails on time.
+        """
+        host = urlsplit(url).hostname
+        if host not in self.CONCURRENCY_LIMITS:
+            slot = contextlib.nullcontext()
+        else:
+            slot = get_host(host).scheduler(self.CONCURRENCY_LIMITS[host]).slot(priority)
 
         try:
-            async with self.http.request(
-                method, f"{service_base}{route}", **kwargs
-            ) as resp:
-                self.logger.debug(
-                    f"{method} {service_base}{route} returned {resp.status}"
+            async with asyncio.timeout_at(deadline), slot:
+                await self.throttle(url)
+                loop = asyncio.get_running_loop()
+                started = loop.time()
+                remaining = deadline - started
+                if remaining <= 0:
+                    raise TimeoutError
+                if sent is not None:
+                    sent.set()
+                data = await self._request(
+                    method, url, response_as_text, timeout=aiohttp.ClientTimeout(total=remaining), **kwargs
                 )
+                get_host(host).latency.record(loop.time() - started)
+                return data
+        except TimeoutError:
+            raise HTTPTimeout("Timed out connecting. Please try again in a few minutes.")
+
+    async def _hedged(
+        self,
+        method: str,
+        url: str,
+        response_as_text: bool,
+        deadline: float,
+        priority: Priority,
+        hedge_after: float,
+        **kwargs,
+    ):
+        """
+        Sends the request, and a duplicate if the first hasn't answered *hedge_after* seconds after it went out. While
+        the request is still queued for a slot or a token, a duplicate would only queue behind it, so it isn't hedged.
+        """
+        sent = asyncio.Event()
+        first = asyncio.create_task(
+            self._send(method, url, response_as_text, deadline, priority, sent=sent, **kwargs)
+        )
+        tasks = {first}
+        waiting = asyncio.create_task(sent.wait())
+        try:
+            await asyncio.wait({first, waiting}, return_when=asyncio.FIRST_COMPLETED)
+            if first.done():
+                return first.result()
+
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if done:
+                return done.pop().result()
+
+            self.logger.debug(f"Hedging {method} {url} after {hedge_after:.2f}s")
+            tasks.add(asyncio.create_task(self._send(method, url, response_as_text, deadline, priority, **kwargs)))
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            waiting.cancel()
+            for task in tasks:
+                task.cancel()
+
+    async def _request(
+        self, method: str, url: str, response_as_text=False, response_model: type[BaseModel] = None, **kwargs
+    ):
+        try:
+            async with self.http.request(method, url, **kwargs) as resp:
+                self.logger.debug(f"{method} {url} returned {resp.status}")
                 if not 199 < resp.status < 300:
                     data = await resp.text()
                     self.logger.warning(
-                        f"{method} {service_base}{route} returned {resp.status} {resp.reason}\n{data}"
+                        f"{method} {url} returned {resp.status} {resp.reason}\n{data}"
                     )
                     raise HTTPStatusException(
                         resp.status,
                         f"Request returned an error: {resp.status}: {resp.reason}",
+                        retry_after=parse_retry_after(resp.headers.get("Retry-After")),
                     )
                 try:
-                    if not response_as_text:
+                    if response_model is not None:
+                        # Validate straight from the raw bytes, never building the full JSON object
+                        data = response_model.model_validate_json(await resp.read())
+                    elif not response_as_text:
                         data = await resp.json()
                     else:
                         data = await resp.text()
@@ -57,16 +321,27 @@ class BaseClient(abc.ABC):
                 except (aiohttp.ContentTypeError, ValueError, TypeError):
                     data = await resp.text()
                     self.logger.warning(
-                        f"{method} {service_base}{route} response could not be deserialized:\n{data}"
+                        f"{method} {url} response could not be deserialized:\n{data}"
                     )
-                    raise HTTPException(f"Could not deserialize response: {data}")
-        except aiohttp.ServerTimeoutError:
-            self.logger.warning(f"Request timeout: {method} {service_base}{route}")
+                    raise HTTPDecodeError(f"Could not deserialize response: {data}")
+        except asyncio.TimeoutError:
+            self.logger.warning(f"Request timeout: {method} {url}")
             raise HTTPTimeout(
                 "Timed out connecting. Please try again in a few minutes."
             )
+        except aiohttp.ClientConnectionError as e:
+            self.logger.warning(f"Connection error: {method} {url}: {e}")
+            raise HTTPConnectionError(
+                "Could not connect. Please try again in a few minutes."
+            )
         return data
 
+    async def throttle(self, url: str):
+        """Waits for a token from the rate limiter of the URL's host, if that host is rate limited."""
+        host = urlsplit(url).hostname
+        if host in self.RATE_LIMITS:
+            await get_host(host).bucket(*self.RATE_LIMITS[host]).acquire()
+
     async def get(self, route: str, **kwargs):
         return await self.request("GET", route, **kwargs)
 
@@ -74,4 +349,6 @@ class BaseClient(abc.ABC):
         return await self.request("POST", route, **kwargs)
 
     async def close(self):
-        await self.http.close()
+        # The shared pool is closed on shutdown, only dedicated sessions belong to the client
+        if self._http is not None:
+            await self._http.close()
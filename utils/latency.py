@@ -0,0 +1,19 @@
+import collections
+
+
+class LatencyTracker:
+    """A rolling window of recent response times for a host, used to pick when a request is worth hedging."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples = collections.deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, p: float) -> float | None:
+        """Gets the *p* (0-1) percentile of the window, or None until there are enough samples to trust it."""
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(p * len(ordered)), len(ordered) - 1)]
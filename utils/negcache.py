@@ -0,0 +1,70 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+
+import db
+from models import UnavailableCharacter
+from utils.constants import NEGATIVE_CACHE_BASE_HOURS, NEGATIVE_CACHE_MAX_DAYS
+
+
+class NegativeCache:
+    """
+    Remembers DDB characters that are private or deleted, so they aren't refetched on every lookup. Each consecutive
+    failure doubles the wait before the next re-check, up to *max_wait*.
+
+    Entries are persisted in the ``unavailable_characters`` table, and mirrored in memory so that checking a
+    character doesn't touch the database.
+    """
+
+    def __init__(
+        self,
+        base_wait: timedelta = timedelta(hours=NEGATIVE_CACHE_BASE_HOURS),
+        max_wait: timedelta = timedelta(days=NEGATIVE_CACHE_MAX_DAYS),
+    ):
+        self.base_wait = base_wait
+        self.max_wait = max_wait
+        self._entries: dict[int, UnavailableCharacter] | None = None
+        self._load_lock = asyncio.Lock()
+
+    async def _load(self) -> dict[int, UnavailableCharacter]:
+        async with self._load_lock:
+            if self._entries is None:
+                async with db.async_session() as session:
+                    entries = await session.scalars(select(UnavailableCharacter))
+                    self._entries = {entry.id: entry for entry in entries}
+        return self._entries
+
+    async def get(self, char_id: int) -> UnavailableCharacter | None:
+        """Gets the entry for *char_id* if it is still waiting to be re-checked, otherwise None."""
+        entry = (await self._load()).get(char_id)
+        if entry is None or entry.nextCheck <= datetime.now():
+            return None
+        return entry
+
+    async def record(self, char_id: int, status_code: int):
+        """Records a failed lookup of *char_id*, scheduling its next re-check."""
+        entries = await self._load()
+        now = datetime.now()
+        async with db.async_session() as session:
+            entry = entries.get(char_id)
+            if entry is None:
+                entry = UnavailableCharacter(id=char_id, failures=0)
+            entry.failures += 1
+            entry.status_code = status_code
+            entry.lastChecked = now
+            entry.nextCheck = now + min(self.base_wait * 2 ** (entry.failures - 1), self.max_wait)
+            entries[char_id] = await session.merge(entry)
+            await session.commit()
+
+    async def clear(self, char_id: int):
+        """Forgets *char_id*, as its sheet is reachable again."""
+        entries = await self._load()
+        if entries.pop(char_id, None) is None:
+            return
+        async with db.async_session() as session:
+            await session.execute(delete(UnavailableCharacter).where(UnavailableCharacter.id == char_id))
+            await session.commit()
+
+
+negative_cache = NegativeCache()
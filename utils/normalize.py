@@ -0,0 +1,41 @@
+import re
+from functools import lru_cache
+
+from utils.constants import IGNORED_FEATS, NORMALIZE_CACHE_SIZE, RACE_STANDARDIZATION, SUBCLASS_REPLACEMENTS
+
+# Compiled once, rather than per class/feat of every character
+SUBCLASS_RE = re.compile("|".join(SUBCLASS_REPLACEMENTS))
+FEAT_LEVEL_RE = re.compile(r"^\d+:")
+IGNORED_FEATS_RE = re.compile("|".join(f"(?:{feat})" for feat in IGNORED_FEATS))
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_subclass(name: str) -> str:
+    """Strips the "Path of the", "College of", etc. from a subclass name."""
+    return SUBCLASS_RE.sub("", name)
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_feat(name: str) -> str | None:
+    """Strips the level prefix from a feat name, or returns None if it's a feat we don't track."""
+    name = FEAT_LEVEL_RE.sub("", name).strip()
+    if IGNORED_FEATS_RE.match(name):
+        return None
+    return name
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_race(race: str) -> str:
+    """Groups a race under its base race, e.g. "Wood Elf" -> "Elf". Unknown races are returned unchanged."""
+    for key, value in RACE_STANDARDIZATION.items():
+        if key in race:
+            return value
+    return race
+
+
+def cache_stats() -> dict[str, dict[str, int]]:
+    """Gets the memoization hits, misses and sizes of each normalizer."""
+    return {
+        func.__name__: func.cache_info()._asdict()
+        for func in (normalize_subclass, normalize_feat, normalize_race)
+    }
@@ -0,0 +1,74 @@
+import random
+import time
+
+
+class RetryPolicy:
+    """
+    Decides whether, and how long to wait before, a failed request is retried.
+
+    Delays grow exponentially from *base_delay* up to *max_delay*, with full jitter so that a burst of failing requests
+    doesn't retry in lockstep. A server provided Retry-After is honoured, unless it is longer than *max_retry_after*.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8,
+        max_retry_after: float = 30,
+        methods: tuple[str, ...] = ("GET", "HEAD"),
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.methods = methods
+
+    def delay(self, method: str, attempt: int, retry_after: float = None) -> float | None:
+        """
+        Gets the delay before retrying after the given (1-indexed) failed *attempt*, or None if it should not be
+        retried.
+        """
+        if method.upper() not in self.methods or attempt >= self.max_attempts:
+            return None
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_retry_after else None
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """
+    Tracks consecutive failures for a host. After *failure_threshold* failures in a row the circuit opens and requests
+    fail fast for *reset_timeout* seconds, after which a single trial request is let through to probe the host.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial = False
+
+    def allow(self) -> bool:
+        """Whether a request may be sent right now."""
+        if self.opened_at is None:
+            return True
+        if not self._trial and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._trial = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._trial = False
+
+    def release_trial(self):
+        """Ends a trial that finished without telling us anything about the host, so another request may probe it."""
+        self._trial = False
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert
+
+from models import Character, CharacterClass, CharacterFeat, User
+
+ACTIVE_DAYS = 90
+
+
+def roster_filter(stmt, active_only: bool = True):
+    """
+    Restricts *stmt*, which must select from or join ``characters``, to characters whose player is still on the
+    server, and if *active_only*, has been active in the last ``ACTIVE_DAYS`` days.
+    """
+    stmt = stmt.join(User, Character.user_id == User.id).where(User.onServer)
+    if active_only:
+        stmt = stmt.where(User.lastActive >= datetime.now() - timedelta(days=ACTIVE_DAYS))
+    return stmt
+
+
+def is_active(character: Character, active_only: bool = True) -> bool:
+    """``roster_filter`` for a loaded character, whose user must be loaded too."""
+    user = character.user
+    if user is None or not user.onServer:
+        return False
+    if active_only:
+        return user.lastActive is not None and user.lastActive >= datetime.now() - timedelta(days=ACTIVE_DAYS)
+    return True
+
+
+async def sync_character_children(session, rows: list[dict]):
+    """
+    Rewrites the ``character_classes`` and ``character_feats`` rows of each character in *rows*, from its
+    ``classes``, ``subclasses`` and ``feats`` values. Rows without ``classes`` are left alone.
+    """
+    rows = [row for row in rows if "classes" in row]
+    if not rows:
+        return
+    ids = [row["id"] for row in rows]
+    await session.execute(delete(CharacterClass).where(CharacterClass.character_id.in_(ids)))
+    await session.execute(delete(CharacterFeat).where(CharacterFeat.character_id.in_(ids)))
+
+    classes = []
+    feats = []
+    for row in rows:
+        # Placeholder characters are created with empty lists rather than dicts
+        subclasses = row.get("subclasses") or {}
+        for class_name, level in (row["classes"] or {}).items():
+            classes.append(
+                {
+                    "character_id": row["id"],
+                    "class_name": class_name,
+                    "subclass": subclasses.get(class_name),
+                    "level": level,
+                }
+            )
+        for feat in set(row.get("feats") or ()):
+            feats.append({"character_id": row["id"], "feat": feat})
+
+    if classes:
+        await session.execute(insert(CharacterClass), classes)
+    if feats:
+        await session.execute(insert(CharacterFeat), feats)
@@ -0,0 +1,99 @@
+import asyncio
+from typing import Protocol
+
+from sqlalchemy import select
+
+import db
+from models import Character
+from utils.roster import is_active, roster_filter
+
+
+class RosterListener(Protocol):
+    def roster_reset(self, characters: list[Character]): ...
+
+    def roster_updated(self, char_ids: list[int], characters: list[Character]): ...
+
+
+class RosterCache:
+    """
+    Every character whose player is on the server, with their user, loaded once and kept in memory so read-only
+    commands don't query the database.
+
+    Writers keep it current: ``refresh`` reloads the characters they wrote once committed, and ``invalidate`` drops
+    everything after bulk changes, to be reloaded by the next read. A load running while either happens may have read
+    too early, so it reads again. Listeners added with ``subscribe`` are told of both, so anything derived from the
+    roster can follow along.
+    """
+
+    def __init__(self):
+        self._characters: dict[int, Character] | None = None
+        self._lock = asyncio.Lock()
+        self._version = 0  # Bumped by every write, so a load can tell if it raced one
+        self._listeners: list[RosterListener] = []
+        self.hits = 0
+        self.misses = 0
+
+    def subscribe(self, listener: RosterListener):
+        self._listeners.append(listener)
+        if self._characters is not None:
+            listener.roster_reset(list(self._characters.values()))
+
+    async def load(self) -> dict[int, Character]:
+        """Gets the cached characters by id, loading them if they aren't already."""
+        if self._characters is not None:
+            self.hits += 1
+            return self._characters
+        self.misses += 1
+        async with self._lock:
+            while self._characters is None:
+                version = self._version
+                async with db.async_session() as session:
+                    characters = (await session.scalars(roster_filter(select(Character), active_only=False))).all()
+                if version != self._version:
+                    continue
+                self._characters = {character.id: character for character in characters}
+                for listener in self._listeners:
+                    listener.roster_reset(list(characters))
+        return self._characters
+
+    async def all(self, active_only: bool = True) -> list[Character]:
+        characters = await self.load()
+        return [character for character in characters.values() if is_active(character, active_only)]
+
+    async def refresh(self, char_ids: list[int]):
+        """
+        Reloads the characters in *char_ids*, once their writes have been committed. Characters whose player has left,
+        or that no longer have one, are dropped.
+        """
+        if not char_ids:
+            return
+        self._version += 1
+        if self._characters is None:  # Nothing to update, the next load reads the write
+            return
+        stmt = roster_filter(select(Character), active_only=False).where(Character.id.in_(char_ids))
+        async with db.async_session() as session:
+            characters = (await session.scalars(stmt)).all()
+        if self._characters is None:  # Invalidated meanwhile
+            return
+        for char_id in char_ids:
+            self._characters.pop(char_id, None)
+        self._characters.update((character.id, character) for character in characters)
+        for listener in self._listeners:
+            listener.roster_updated(list(char_ids), list(characters))
+
+    def invalidate(self):
+        """Drops the whole roster, to be reloaded on the next read."""
+        self._version += 1
+        self._characters = None
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._characters) if self._characters is not None else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+roster_cache = RosterCache()
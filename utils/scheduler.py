@@ -0,0 +1,61 @@
+import asyncio
+import contextlib
+import enum
+import heapq
+import itertools
+
+
+class Priority(enum.IntEnum):
+    """Request lanes, lower values are served first."""
+
+    INTERACTIVE = 0  # A user is waiting on the response
+    BATCH = 1  # Background work, like the weekly character refresh
+
+
+class RequestScheduler:
+    """
+    Limits the number of requests in flight to a host. When every slot is taken, waiters are queued by priority and
+    then arrival, so interactive requests jump ahead of any queued batch requests.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for *_, fut in self._waiters if not fut.done())
+
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE):
+        if self.active < self.limit and not self.queued:
+            self.active += 1
+            return
+
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # We were granted a slot just as we were cancelled, so hand it on
+                self.release()
+            raise
+
+    def release(self):
+        self.active -= 1
+        while self._waiters:
+            *_, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                self.active += 1
+                fut.set_result(None)
+                break
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: Priority = Priority.INTERACTIVE):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
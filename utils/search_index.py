@@ -0,0 +1,102 @@
+import bisect
+
+from rapidfuzz import fuzz, process, utils
+
+from models import Character
+from utils.rostercache import roster_cache
+
+# Queries shorter than this only use the prefix index, fuzzy ranking is mostly noise on one or two letters
+FUZZY_MIN_LENGTH = 3
+FUZZY_SCORE_CUTOFF = 60
+
+
+def _tokens(text: str) -> set[str]:
+    """The prefixes a name can be found by: the whole name, and each word of it."""
+    text = text.casefold()
+    return {text, *text.split()}
+
+
+class CharacterSearchIndex:
+    """
+    An autocomplete index over character names and player nicknames, for every character in ``roster_cache``.
+
+    A sorted list of ``(token, id)`` answers prefix queries with a binary search, then rapidfuzz ranks the rest of
+    the roster to catch typos. It follows the roster cache, updating only the characters that were written.
+    """
+
+    def __init__(self):
+        self._prefixes: list[tuple[str, int]] = []
+        self._tokens: dict[int, set[str]] = {}
+        # id -> "{name} 〰 {nickname}", as rapidfuzz choices, already through its default processor
+        self._keys: dict[int, str] = {}
+        self._nicknames: dict[int, str] = {}
+
+    def add(self, character: Character):
+        self.discard(character.id)
+        nickname = character.user.nickname if character.user else None
+        if not nickname:  # Nothing to complete to
+            return
+        tokens = _tokens(character.name) | _tokens(nickname)
+        for token in tokens:
+            bisect.insort(self._prefixes, (token, character.id))
+        self._tokens[character.id] = tokens
+        self._keys[character.id] = utils.default_process(f"{character.name} 〰 {nickname}")
+        self._nicknames[character.id] = nickname
+
+    def discard(self, char_id: int):
+        for token in self._tokens.pop(char_id, ()):
+            i = bisect.bisect_left(self._prefixes, (token, char_id))
+            del self._prefixes[i]
+        self._keys.pop(char_id, None)
+        self._nicknames.pop(char_id, None)
+
+    def roster_reset(self, characters: list[Character]):
+        self._prefixes.clear()
+        self._tokens.clear()
+        self._keys.clear()
+        self._nicknames.clear()
+        for character in characters:
+            self.add(character)
+
+    def roster_updated(self, char_ids: list[int], characters: list[Character]):
+        for char_id in char_ids:
+            self.discard(char_id)
+        for character in characters:
+            self.add(character)
+
+    def _prefix_matches(self, query: str):
+        i = bisect.bisect_left(self._prefixes, (query,))
+        while i < len(self._prefixes) and self._prefixes[i][0].startswith(query):
+            yield self._prefixes[i][1]
+            i += 1
+
+    async def search(self, query: str, limit: int = 25) -> list[str]:
+        """Gets up to *limit* player nicknames matching *query*, prefix matches first, then by fuzzy score."""
+        await roster_cache.load()
+        query = query.casefold().strip()
+        if not query:
+            return list(dict.fromkeys(self._nicknames.values()))[:limit]
+
+        results = {}
+        for char_id in self._prefix_matches(query):
+            results.setdefault(self._nicknames[char_id], None)
+            if len(results) >= limit:
+                return list(results)
+
+        if len(query) >= FUZZY_MIN_LENGTH:
+            matches = process.extract(
+                utils.default_process(query),
+                self._keys,
+                scorer=fuzz.WRatio,
+                score_cutoff=FUZZY_SCORE_CUTOFF,
+                limit=limit,
+            )
+            for _, _, char_id in matches:
+                results.setdefault(self._nicknames[char_id], None)
+                if len(results) >= limit:
+                    break
+        return list(results)
+
+
+search_index = CharacterSearchIndex()
+roster_cache.subscribe(search_index)
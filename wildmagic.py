@@ -3,8 +3,6 @@ import sys
 import logging
 import traceback
 
-import aiohttp
-
 import db
 import errors
 from utils import checks, constants
@@ -20,6 +18,7 @@ from disnake.ext.commands import (
 from disnake.ext.commands import MissingAnyRole
 
 from utils.ddbclient import DDBClient
+from utils.httpclient import http_pool
 
 logging.basicConfig(level=logging.INFO)
 
@@ -84,6 +83,10 @@ class WildmagicBot(commands.Bot):
         super().__init__(*args, **kwargs)
         self.ddb_client = None
 
+    async def close(self):
+        await super().close()
+        await http_pool.close()
+
 
 bot = WildmagicBot(
     command_prefix=commands.when_mentioned_or(PREFIX),
@@ -165,5 +168,5 @@ if __name__ == "__main__":
     for cog in COGS:
         bot.load_extension(cog)
     bot.loop.create_task(db.init_db())
-    bot.ddb_client = DDBClient(aiohttp.ClientSession(loop=bot.loop), constants.BEARER_TOKEN)
+    bot.ddb_client = DDBClient(constants.BEARER_TOKEN)
     bot.run(constants.TOKEN)